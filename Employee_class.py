@@ -1,15 +1,456 @@
+import asyncio
+import heapq
 import re
-from datetime import datetime
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from heapq import heappop, heappush
+from datetime import datetime, timedelta
+from itertools import islice
 
 
-class Employee:
+class LockStripes:
+    '''A fixed number of locks shared by any number of keys, each key
+    always getting the same lock: threads working on different keys seldom
+    wait for each other, with no lock per key to create or clean up.'''
+
+    def __init__(self, count=64):
+        self._locks = [threading.Lock() for _ in range(count)]
+
+    def __call__(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def holding(self, keys):
+        '''Hold the locks of all the keys, taken in one order by every
+        thread so that none waits for another holding what it needs.'''
+        locks = sorted({hash(key) % len(self._locks) for key in keys})
+        for index in locks:
+            self._locks[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(locks):
+                self._locks[index].release()
+
+    def all(self):
+        return self.holding(range(len(self._locks)))
+
+
+class TeamRegistry:
+    '''Teams keyed on the identity of their members (not on their tenure,
+    as comparing with == would do), with an index from each member to
+    their teams. The order of the members does not make another team.
+    Thread-safe: a change holds the locks of the team key and of its
+    members only.'''
+
+    def __init__(self, stripes=64):
+        self._teams = {}           # {frozenset of member ids: team tuple}
+        self._member_teams = {}    # {member id: set of team keys}
+        self._locks = LockStripes(stripes)
+
+    @staticmethod
+    def _key(members):
+        return frozenset(member.identity() for member in members)
+
+    def add(self, members):
+        '''Register the team, return False if it already exists.'''
+        key = self._key(members)
+        with self._locks.holding((key, *key)):
+            if key in self._teams:
+                return False
+            self._teams[key] = tuple(members)
+            for member in key:
+                self._member_teams.setdefault(member, set()).add(key)
+            return True
+
+    def remove(self, members):
+        key = self._key(members)
+        with self._locks.holding((key, *key)):
+            del self._teams[key]
+            for member in key:
+                self._member_teams[member].discard(key)
+                if not self._member_teams[member]:
+                    del self._member_teams[member]
+
+    async def add_async(self, members):
+        '''add() for coroutines, waiting for the locks in a worker thread
+        instead of blocking the event loop.'''
+        return await asyncio.to_thread(self.add, members)
+
+    async def remove_async(self, members):
+        return await asyncio.to_thread(self.remove, members)
+
+    def teams_of(self, employee):
+        member = employee.identity()
+        with self._locks(member):
+            return [self._teams[key] for key in self._member_teams.get(member, ())]
+
+    def __contains__(self, members):
+        return self._key(members) in self._teams
+
+    def __iter__(self):
+        return iter(list(self._teams.values()))
+
+    def __len__(self):
+        return len(self._teams)
+
+
+class EmailAllocator:
+    '''Unique addresses base@domain, base2@domain, base3@domain, ... for
+    each base name. A counter per base gives the next new number and a heap
+    per base the released ones, smallest first, so the same sequence of
+    calls always gives the same addresses and nothing is rescanned.
+    Thread-safe: the addresses of a base only change under the lock of the
+    base, so threads allocating for other names do not wait.'''
+
+    def __init__(self, domain='company.com', stripes=64):
+        self.domain = domain
+        self._taken = set()
+        self._next = {}    # {base: next number never given out}
+        self._free = {}    # {base: heap of released numbers}
+        self._locks = LockStripes(stripes)
+
+    def _address(self, base, number):
+        return f'{base}@{self.domain}' if number == 1 else f'{base}{number}@{self.domain}'
+
+    @staticmethod
+    def _split(email):
+        local = email.rpartition('@')[0]
+        base = local.rstrip('0123456789')
+        return base, int(local[len(base):] or 1)
+
+    def _load(self, base):
+        '''Called with the lock of the base held before the base is used,
+        for allocators that learn the taken addresses of a base only when
+        it is needed.'''
+
+    def allocate(self, base):
+        '''Take the first free address of the base name and return it.'''
+        with self._locks(base):
+            self._load(base)
+            free = self._free.get(base)
+            while free:
+                email = self._address(base, heappop(free))
+                if email not in self._taken:
+                    break
+            else:
+                number = self._next.get(base, 1)
+                while self._address(base, number) in self._taken:    # reserved by hand
+                    number += 1
+                self._next[base] = number + 1
+                email = self._address(base, number)
+            self._taken.add(email)
+            return email
+
+    def reserve(self, email):
+        '''Take this very address, return False if it is taken.'''
+        base = self._split(email)[0]
+        with self._locks(base):
+            self._load(base)
+            if email in self._taken:
+                return False
+            self._taken.add(email)
+            return True
+
+    def release(self, email):
+        base, number = self._split(email)
+        with self._locks(base):
+            self._load(base)
+            if email not in self._taken:
+                return
+            self._taken.remove(email)
+            if number < self._next.get(base, 1):
+                heappush(self._free.setdefault(base, []), number)
+
+    async def allocate_async(self, base):
+        '''allocate() for coroutines, waiting for the lock (and a store
+        reading the base) in a worker thread instead of the event loop.'''
+        return await asyncio.to_thread(self.allocate, base)
+
+    async def reserve_async(self, email):
+        return await asyncio.to_thread(self.reserve, email)
+
+    async def release_async(self, email):
+        return await asyncio.to_thread(self.release, email)
+
+    def clear(self):
+        with self._locks.all():
+            self._taken.clear()
+            self._next.clear()
+            self._free.clear()
+
+    def __contains__(self, email):
+        base = self._split(email)[0]
+        with self._locks(base):
+            self._load(base)
+            return email in self._taken
+
+    def __iter__(self):
+        return iter(list(self._taken))
+
+    def __len__(self):
+        return len(self._taken)
+
+
+class EmployeeRecord:
+    '''What Employee and the rows of EmployeeTable have in common: the
+    validation rules of the attributes, the derived attributes, comparison
+    by tenure and teams. Subclasses store the attributes.'''
+
+    __slots__ = ()
     date_formats = {'%d.%m.%Y', '%d/%m/%Y', '%d-%m-%Y',
                     '%d.%m.%y', '%d/%m/%y', '%d-%m-%y'}
-    emails = set()
-    teams = []
+    emails = EmailAllocator()
+    teams = TeamRegistry()
+    listeners = []    # functions called as listener(record, attribute, old, new) when a setter changes a value
+    _listening = True
+    _renaming = set()    # identities of the records whose full_name is being set, their email follows once at the end
+    phone_pattern = re.compile(r'^0(33|41|43|44|49|55|77|91|93|94|95|96|98|99) ([0-9]{2} [0-9]{2} [0-9]{2})$')
+    email_pattern = re.compile(r'^[a-z]+\.[a-z]+([2-9]|[1-9][0-9]+)?@company.com$')
+
+    @staticmethod
+    def valid_name(value, attribute):
+        if isinstance(value, str):
+            return value
+        raise ValueError(f'{attribute} should be a string.')
+
+    @classmethod
+    def is_phone_number(cls, phone_number):
+        if cls.phone_pattern.search(phone_number):
+            return True
+        else:
+            return False
+
+    @classmethod
+    def valid_phone_number(cls, value):
+        if not isinstance(value, str) and value is not None:
+            raise TypeError('phone_number should be either a string in "0xx xx xx xx" format or None.')
+        if value is None or cls.is_phone_number(value):
+            return value
+        raise ValueError('Not a valid phone number.')
+
+    @classmethod
+    def is_corporate_email(cls, email):
+        if cls.email_pattern.search(email):
+            return True
+        else:
+            return False
+
+    @classmethod
+    def claim_email(cls, value):
+        '''Validate the email and take it from the pool of free emails.
+        Return it, or None if somebody already has it.'''
+        if not isinstance(value, str) and value is not None:
+            raise TypeError('work_email should be either a valid email ending @company.com or None.')
+        if value is not None and not cls.is_corporate_email(value):
+            raise ValueError('Invalid email address.')
+        if value is None:
+            return None
+        if cls.emails.reserve(value):
+            return value
+        print(f'work_email {value} already exists. Please enter another one manually.')
+        return None
+
+    @classmethod
+    def new_email(cls, first_name, last_name):
+        '''Allocate the first free first.last@company.com, first.last2@...'''
+        base = f'{first_name.lower()}.{last_name.lower()}'
+        if not cls.is_corporate_email(f'{base}@company.com'):
+            raise ValueError('Invalid email address.')
+        return cls.emails.allocate(base)
+
+    def _change_email(self, email):
+        '''Replace the work email by an already claimed one, releasing the
+        old one.'''
+        old = self.work_email
+        if old is not None and old != email:
+            self.emails.release(old)
+        self._store_email(email)
+        self._notify('work_email', old, email)
+
+    def _follow_email(self, attribute, old, new):
+        '''Release the email of who leaves, give one back to who returns
+        and a new one after a rename (keeping the old one if the name makes
+        the same email, or cannot make one). The old email is released
+        before the new one is allocated, so it can be given back.'''
+        if attribute == 'leave_date':
+            if old is None and self.work_email is not None:
+                self._change_email(None)
+            elif new is None and self.work_email is None:
+                self._change_email(self.new_email(self.first_name, self.last_name))
+        elif self.work_email is not None and self.leave_date is None:
+            base = f'{self.first_name.lower()}.{self.last_name.lower()}'
+            if not self.is_corporate_email(f'{base}@company.com') or self.emails._split(self.work_email)[0] == base:
+                return
+            old_email = self.work_email
+            self.emails.release(old_email)
+            try:
+                email = self.emails.allocate(base)
+            except BaseException:
+                self.emails.reserve(old_email)
+                raise
+            self._store_email(email)
+            self._notify('work_email', old_email, email)
+
+    @staticmethod
+    def valid_trial_passed(value):
+        if isinstance(value, bool):
+            return value
+        raise ValueError('trial_passed should be either True or False.')
+
+    @classmethod
+    def parse_date(cls, value, message):
+        for format in cls.date_formats:
+            try:
+                return datetime.strptime(value, format)
+            except (ValueError, TypeError):
+                continue
+        raise ValueError(message)
+
+    @classmethod
+    def valid_join_date(cls, value, now=None):
+        dt = cls.parse_date(value, 'Date should be a string in "dd.mm.yyyy" format.')
+        return cls.check_join_date(dt, now)
+
+    @staticmethod
+    def check_join_date(dt, now=None):
+        '''Not to allow to enter join_dates before 2000 (let's assume this is
+        when the company was established) or dates too much into future'''
+        if dt < datetime(2000, 1, 1) or (dt - (now or datetime.now())).days > 30:
+            raise ValueError('Date <2000 or in more than a month not allowed.')
+        return dt
+
+    @classmethod
+    def valid_leave_date(cls, value, join_date):
+        if value is None:
+            return None
+        dt = cls.parse_date(value, 'Not a valid date.')
+        return cls.check_leave_date(dt, join_date)
+
+    @staticmethod
+    def check_leave_date(dt, join_date):
+        if dt < join_date:
+            raise ValueError('leave_date cannot come before join_date.')
+        return dt
+
+    @staticmethod
+    def valid_salary(value):
+        try:
+            if value < 10000 or value > 5000000:
+                raise ValueError('Not a valid number for salary.')
+            return value
+        except TypeError:
+            raise TypeError('Salary should be a number')
+
+    @staticmethod
+    def valid_gender(value):
+        if value not in ('M', 'F'):
+            raise ValueError('gender must be "M" or "F"')
+        return value
+
+    def _notify(self, attribute, old, new):
+        if self._listening and old != new:
+            for listener in self.listeners:    # before the email change that follows, to keep the order of causes
+                listener(self, attribute, old, new)
+            renamed = attribute in ('first_name', 'last_name') and self.identity() not in self._renaming
+            if attribute == 'leave_date' or renamed:
+                self._follow_email(attribute, old, new)
+
+    def identity(self):
+        '''Key telling records apart (the record itself, unlike == which
+        compares tenure).'''
+        return id(self)
+
+    def identity_owner(self):
+        '''Object keeping identity() taken: once it is collected, another
+        record can get the same identity.'''
+        return self
+
+    @property
+    def full_name(self):
+        return self.first_name + ' ' + self.last_name
+
+    @full_name.setter
+    def full_name(self, value):
+        if not isinstance(value, str):
+            raise TypeError('full_name should be a string consisting of two words.')
+        name = value.split()
+        if len(name) != 2:
+            raise ValueError('full_name should consist of two words.')
+        else:
+            old = self.full_name
+            self._renaming.add(self.identity())
+            try:
+                self.first_name, self.last_name = name
+            finally:
+                self._renaming.discard(self.identity())
+                if self._listening:    # a single email for the whole rename
+                    self._follow_email('full_name', old, self.full_name)
+
+    def __repr__(self):
+        return f'<Person {self.first_name} {self.last_name}>'
+
+    def time_worked(self):
+        if self.leave_date:
+            return self.leave_date - self.join_date
+        else:
+            return datetime.today() - self.join_date
+
+    def __lt__(self, other):
+        if not isinstance(other, EmployeeRecord):
+            raise TypeError(f'unsupported operation between types {type(self)} and {type(other)}')
+        if self.time_worked() < other.time_worked():
+            return True
+        else:
+            return False
+
+    def __le__(self, other):
+        if not isinstance(other, EmployeeRecord):
+            raise TypeError(f'unsupported operation between types {type(self)} and {type(other)}')
+        if self.time_worked() <= other.time_worked():
+            return True
+        else:
+            return False
+        
+    def __eq__(self, other):
+        if not isinstance(other, EmployeeRecord):
+            raise TypeError('unsupported operation between types {type(self)} and {type(other)}')
+        if self.time_worked() == other.time_worked():
+            return True
+        else:
+            return False
+
+    def check_team(self, *others):
+        '''The rules of a team: records of employees still working in the
+        company, nobody teamed up to themselves. Raise on the first one
+        broken.'''
+        if self.leave_date:
+                raise ValueError(f'{self} is not working in the company anymore.')
+        seen = {self.identity()}
+        for other in others:
+            if not isinstance(other, EmployeeRecord):
+                raise TypeError('Unsupported operation between types {type(self)} and {type(other)}')
+            if other.identity() in seen:
+                raise ValueError('Cannot team up the person to themselves.')
+            if other.leave_date:
+                raise ValueError(f'{other} is not working in the company anymore.')
+            seen.add(other.identity())
+
+    def __add__(self, *others):
+        self.check_team(*others)
+        if not self.__class__.teams.add((self, *others)):
+            print('The team already exists.')
+
+
+class Employee(EmployeeRecord):
+    employee_id = None    # key of the employee in an EmployeeStore, once stored
 
     def __init__(self, first_name, last_name, join_date, salary, gender,
                  leave_date=None, phone_number=None, trial_passed=False):
+        self._listening = False    # No change events while being created
         self._first_name = None    # To prevent deletion / leaving empty
         self.first_name = first_name
         self._last_name = None    # To prevent deletion / leaving empty
@@ -18,7 +459,6 @@ class Employee:
         self.phone_number = phone_number
         self._email_first = None
         self._email_last = None
-        self.work_email = f'{first_name.lower()}.{self.last_name.lower()}@company.com'
         self._trial_passed = None
         self.trial_passed = trial_passed
         self._join_date = None
@@ -29,17 +469,42 @@ class Employee:
         self.salary = salary
         self._gender = None
         self.gender = gender
+        if self.leave_date is None:
+            self._store_email(self.new_email(self.first_name, self.last_name))
+        self._listening = True
         
+    @classmethod
+    async def create_async(cls, *args, **kwargs):
+        '''Employee(...) for coroutines, run in a worker thread so that
+        waiting for the email lock does not block the event loop.'''
+        return await asyncio.to_thread(cls, *args, **kwargs)
+
+    @classmethod
+    def restore(cls, first_name, last_name, join_date, salary, gender,
+                leave_date=None, phone_number=None, trial_passed=False, work_email=None):
+        '''Employee from values validated before, e.g. read back from an
+        EmployeeStore: dates are datetimes, nothing is validated, no change
+        events are sent and the email is taken as it is.'''
+        self = cls.__new__(cls)
+        self._first_name = first_name
+        self._last_name = last_name
+        self._phone_number = phone_number
+        self._trial_passed = trial_passed
+        self._join_date = join_date
+        self._leave_date = leave_date
+        self._salary = salary
+        self._gender = gender
+        self._store_email(work_email)
+        return self
+
     @property
     def first_name(self):
         return self._first_name
 
     @first_name.setter
     def first_name(self, value):
-        if isinstance(value, str):
-            self._first_name = value
-        else:
-            raise ValueError('first_name should be a string.')
+        old, self._first_name = self._first_name, self.valid_name(value, 'first_name')
+        self._notify('first_name', old, self._first_name)
 
     @property
     def last_name(self):
@@ -47,32 +512,8 @@ class Employee:
 
     @last_name.setter
     def last_name(self, value):
-        if isinstance(value, str):
-            self._last_name = value
-        else:
-            raise ValueError('last_name should be a string.')
-
-    @property
-    def full_name(self):
-        return self.first_name + ' ' + self.last_name
-
-    @full_name.setter
-    def full_name(self, value):
-        if not isinstance(value, str):
-            raise TypeError('full_name should be a string consisting of two words.')
-        name = value.split()
-        if len(name) != 2:
-            raise ValueError('full_name should consist of two words.')
-        else:
-            self.first_name, self.last_name = name
-
-    @staticmethod
-    def is_phone_number(phone_number):
-        pattern = r'^0(33|41|43|44|49|55|77|91|93|94|95|96|98|99) ([0-9]{2} [0-9]{2} [0-9]{2})$'
-        if re.search(pattern, phone_number):
-            return True
-        else:
-            return False
+        old, self._last_name = self._last_name, self.valid_name(value, 'last_name')
+        self._notify('last_name', old, self._last_name)
 
     @property
     def phone_number(self):
@@ -80,20 +521,8 @@ class Employee:
 
     @phone_number.setter
     def phone_number(self, value):
-        if not isinstance(value, str) and value is not None:
-            raise TypeError('phone_number should be either a string in "0xx xx xx xx" format or None.')
-        if value is None or self.is_phone_number(value):
-            self._phone_number = value
-        else:
-            raise ValueError('Not a valid phone number.')
-
-    @staticmethod
-    def is_corporate_email(email):
-        pattern = r'^[a-z]+\.[a-z]+@company.com$'
-        if re.search(pattern, email):
-            return True
-        else:
-            return False
+        old, self._phone_number = self._phone_number, self.valid_phone_number(value)
+        self._notify('phone_number', old, self._phone_number)
 
     @property
     def work_email(self):
@@ -104,18 +533,17 @@ class Employee:
 
     @work_email.setter
     def work_email(self, value):
-        if not isinstance(value, str) and value is not None:
-            raise TypeError('work_email should be either a valid email ending @company.com or None.')
-        if value is not None and not self.is_corporate_email(value):
-            raise ValueError('Invalid email address.')
-        if value not in self.__class__.emails:
-            name = value.split('@')
+        if value is not None and value == self.work_email:
+            return
+        self._change_email(self.claim_email(value))
+
+    def _store_email(self, email):
+        if email is not None:
+            name = email.split('@')
             self._email_first, self._email_last = name[0].split('.')
-            self.__class__.emails.add(value)
         else:
             self._email_first = None
             self._email_last = None
-            print(f'work_email {value} already exists. Please enter another one manually.')
 
     @property
     def trial_passed(self):
@@ -123,10 +551,8 @@ class Employee:
 
     @trial_passed.setter
     def trial_passed(self, value):
-        if isinstance(value, bool):
-            self._trial_passed = value
-        else:
-            raise ValueError('trial_passed should be either True or False.')
+        old, self._trial_passed = self._trial_passed, self.valid_trial_passed(value)
+        self._notify('trial_passed', old, self._trial_passed)
 
     @property
     def join_date(self):
@@ -134,21 +560,8 @@ class Employee:
 
     @join_date.setter
     def join_date(self, value):
-        for format in self.__class__.date_formats:
-            try:
-                dt = datetime.strptime(value, format)
-                break
-            except (ValueError, TypeError):
-                continue
-        else:
-            raise ValueError('Date should be a string in "dd.mm.yyyy" format.')
-
-        '''Not to allow to enter join_dates before 2000 (let's assume this is
-        when the company was established) or dates too much into future'''
-        if dt < datetime(2000, 1, 1) or (dt - datetime.now()).days > 30:
-            raise ValueError('Date <2000 or in more than a month not allowed.')
-        else:
-            self._join_date = dt
+        old, self._join_date = self._join_date, self.valid_join_date(value)
+        self._notify('join_date', old, self._join_date)
 
     @property
     def leave_date(self):
@@ -156,22 +569,8 @@ class Employee:
 
     @leave_date.setter
     def leave_date(self, value):
-        if value is None:
-            self._leave_date = value
-            return
-        for format in self.__class__.date_formats:
-            try:
-                dt = datetime.strptime(value, format)
-                break
-            except (ValueError, TypeError):
-                continue
-        else:
-            raise ValueError('Not a valid date.')
-
-        if dt < self.join_date:
-            raise ValueError('leave_date cannot come before join_date.')
-        else:
-            self._leave_date = dt
+        old, self._leave_date = self._leave_date, self.valid_leave_date(value, self.join_date)
+        self._notify('leave_date', old, self._leave_date)
 
     @property
     def salary(self):
@@ -179,13 +578,8 @@ class Employee:
 
     @salary.setter
     def salary(self, value):
-        try:
-            if value < 10000 or value > 5000000:
-                raise ValueError('Not a valid number for salary.')
-            else:
-                self._salary = value
-        except TypeError:
-            raise TypeError('Salary should be a number')
+        old, self._salary = self._salary, self.valid_salary(value)
+        self._notify('salary', old, self._salary)
 
     @property
     def gender(self):
@@ -193,55 +587,404 @@ class Employee:
 
     @gender.setter
     def gender(self, value):
-        if value not in ('M', 'F'):
-            raise ValueError('gender must be "M" or "F"')
-        self._gender = value
+        old, self._gender = self._gender, self.valid_gender(value)
+        self._notify('gender', old, self._gender)
 
-    def __repr__(self):
-        return f'<Person {self.first_name} {self.last_name}>'
 
-    def time_worked(self):
-        if self.leave_date:
-            return self.leave_date - self.join_date
-        else:
-            return datetime.today() - self.join_date
+class EmployeeRow(EmployeeRecord):
+    '''View of a row of an EmployeeTable that reads and writes the columns
+    of the table and otherwise behaves like an Employee.'''
 
-    def __lt__(self, other):
-        if not isinstance(other, Employee):
-            raise TypeError(f'unsupported operation between types {type(self)} and {type(other)}')
-        if self.time_worked() < other.time_worked():
-            return True
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def identity(self):
+        return (id(self._table), self._index)
+
+    def identity_owner(self):
+        return self._table
+
+    @property
+    def first_name(self):
+        return self._table.first_names[self._index]
+
+    @first_name.setter
+    def first_name(self, value):
+        old = self.first_name
+        self._table.first_names[self._index] = sys.intern(self.valid_name(value, 'first_name'))
+        self._notify('first_name', old, self.first_name)
+
+    @property
+    def last_name(self):
+        return self._table.last_names[self._index]
+
+    @last_name.setter
+    def last_name(self, value):
+        old = self.last_name
+        self._table.last_names[self._index] = sys.intern(self.valid_name(value, 'last_name'))
+        self._notify('last_name', old, self.last_name)
+
+    @property
+    def phone_number(self):
+        return self._table.phone_numbers.get(self._index)
+
+    @phone_number.setter
+    def phone_number(self, value):
+        old = self.phone_number
+        value = self.valid_phone_number(value)
+        if value is None:
+            self._table.phone_numbers.pop(self._index, None)
         else:
-            return False
+            self._table.phone_numbers[self._index] = value
+        self._notify('phone_number', old, self.phone_number)
 
-    def __le__(self, other):
-        if not isinstance(other, Employee):
-            raise TypeError(f'unsupported operation between types {type(self)} and {type(other)}')
-        if self.time_worked() <= other.time_worked():
-            return True
+    @property
+    def work_email(self):
+        return self._table.emails[self._index]
+
+    @work_email.setter
+    def work_email(self, value):
+        if value is not None and value == self.work_email:
+            return
+        self._change_email(self.claim_email(value))
+
+    def _store_email(self, email):
+        self._table.emails[self._index] = email
+
+    @property
+    def trial_passed(self):
+        return bool(self._table.trials[self._index])
+
+    @trial_passed.setter
+    def trial_passed(self, value):
+        old = self.trial_passed
+        self._table.trials[self._index] = self.valid_trial_passed(value)
+        self._notify('trial_passed', old, self.trial_passed)
+
+    @property
+    def join_date(self):
+        return self._table.to_date(self._table.join_days[self._index])
+
+    @join_date.setter
+    def join_date(self, value):
+        old = self.join_date
+        self._table.join_days[self._index] = self._table.to_day(self.valid_join_date(value))
+        self._notify('join_date', old, self.join_date)
+
+    @property
+    def leave_date(self):
+        return self._table.to_date(self._table.leave_days[self._index])
+
+    @leave_date.setter
+    def leave_date(self, value):
+        old = self.leave_date
+        self._table.leave_days[self._index] = self._table.to_day(self.valid_leave_date(value, self.join_date))
+        self._notify('leave_date', old, self.leave_date)
+
+    @property
+    def salary(self):
+        return self._table.salary(self._index)
+
+    @salary.setter
+    def salary(self, value):
+        old = self.salary
+        self._table.set_salary(self._index, self.valid_salary(value))
+        self._notify('salary', old, self.salary)
+
+    @property
+    def gender(self):
+        return chr(self._table.genders[self._index])
+
+    @gender.setter
+    def gender(self, value):
+        old = self.gender
+        self._table.genders[self._index] = ord(self.valid_gender(value))
+        self._notify('gender', old, self.gender)
+
+
+class EmployeeTable:
+    '''Employees stored column by column instead of as an object each:
+    interned names, dates as days since 01.01.2000 in int64 arrays (-1 for
+    no leave_date), int salaries in an int64 array (others, like floats,
+    kept as given aside), genders and trial statuses in byte arrays. Rows
+    are added with the arguments of Employee and the same validation, and
+    read and changed through EmployeeRow views.'''
+
+    epoch = datetime(2000, 1, 1)
+
+    def __init__(self):
+        self.first_names = []
+        self.last_names = []
+        self.emails = []
+        self.phone_numbers = {}    # {row: phone number}, most are None
+        self.join_days = array('q')
+        self.leave_days = array('q')
+        self.salaries = array('q')
+        self.other_salaries = {}    # {row: salary} of the salaries that are not ints, 0 in 'salaries'
+        self.genders = bytearray()
+        self.trials = bytearray()
+
+    @classmethod
+    def to_day(cls, dt):
+        return -1 if dt is None else (dt - cls.epoch).days
+
+    @classmethod
+    def to_date(cls, day):
+        return None if day < 0 else cls.epoch + timedelta(days=day)
+
+    def append(self, first_name, last_name, join_date, salary, gender,
+               leave_date=None, phone_number=None, trial_passed=False):
+        first_name = EmployeeRecord.valid_name(first_name, 'first_name')
+        last_name = EmployeeRecord.valid_name(last_name, 'last_name')
+        phone_number = EmployeeRecord.valid_phone_number(phone_number)
+        trial_passed = EmployeeRecord.valid_trial_passed(trial_passed)
+        join_dt = EmployeeRecord.valid_join_date(join_date)
+        leave_dt = EmployeeRecord.valid_leave_date(leave_date, join_dt)
+        salary = EmployeeRecord.valid_salary(salary)
+        gender = EmployeeRecord.valid_gender(gender)
+        email = EmployeeRecord.new_email(first_name, last_name) if leave_dt is None else None
+
+        index = len(self.first_names)
+        self.first_names.append(sys.intern(first_name))
+        self.last_names.append(sys.intern(last_name))
+        self.emails.append(email)
+        if phone_number is not None:
+            self.phone_numbers[index] = phone_number
+        self.join_days.append(self.to_day(join_dt))
+        self.leave_days.append(self.to_day(leave_dt))
+        self.salaries.append(0)
+        self.set_salary(index, salary)
+        self.genders.append(ord(gender))
+        self.trials.append(trial_passed)
+        return EmployeeRow(self, index)
+
+    def extend(self, first_names, last_names, emails, phone_numbers, join_days, leave_days, salaries, genders,
+               trials):
+        '''Add already validated columns (emails already allocated, dates as
+        day offsets, genders as 'M' / 'F', phone numbers with None), as
+        done by employee_import.'''
+        offset = len(self)
+        self.first_names.extend(map(sys.intern, first_names))
+        self.last_names.extend(map(sys.intern, last_names))
+        self.emails.extend(emails)
+        self.phone_numbers.update((offset + i, phone) for i, phone in enumerate(phone_numbers) if phone is not None)
+        self.join_days.extend(join_days)
+        self.leave_days.extend(leave_days)
+        self.salaries.extend(salary if type(salary) is int else 0 for salary in salaries)
+        self.other_salaries.update((offset + i, salary) for i, salary in enumerate(salaries)
+                                   if type(salary) is not int)
+        self.genders.extend(map(ord, genders))
+        self.trials.extend(trials)
+
+    def salary(self, index):
+        return self.other_salaries.get(index, self.salaries[index])
+
+    def set_salary(self, index, salary):
+        if type(salary) is int:
+            self.salaries[index] = salary
+            self.other_salaries.pop(index, None)
         else:
-            return False
-        
-    def __eq__(self, other):
-        if not isinstance(other, Employee):
-            raise TypeError('unsupported operation between types {type(self)} and {type(other)}')
-        if self.time_worked() == other.time_worked():
-            return True
+            self.salaries[index] = 0
+            self.other_salaries[index] = salary
+
+    def __len__(self):
+        return len(self.first_names)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('EmployeeTable index out of range')
+        return EmployeeRow(self, index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield EmployeeRow(self, index)
+
+
+class TenureIndex:
+    '''Employees (or table rows) ordered by tenure against a single
+    reference date (today by default), so that sorting and tenure queries
+    do not recompute time_worked() with a new "now" on every comparison.
+    Employees still working are kept sorted by join date, those who left
+    by tenure and in an interval tree of their working days (rebuilt on
+    the first query after a change), and all join and leave dates in
+    sorted lists. The index follows changes of join_date and leave_date through
+    EmployeeRecord.listeners until it is closed.'''
+
+    def __init__(self, records=(), reference=None):
+        self.reference = reference or datetime.today()
+        self._ids = {}         # {record identity: sequence number}
+        self._records = {}     # {sequence number: (record, join day, leave day)}
+        self._count = 0
+        self._active = []      # [(join day, sequence number)] of the employees still working
+        self._left = []        # [(tenure in days, sequence number)] of those who left
+        self._left_tree = None    # interval tree of those who left, None until needed again
+        self._joins = []       # all join days
+        self._leaves = []      # all leave days
+        self.update(records)
+        EmployeeRecord.listeners.append(self._changed)
+
+    @staticmethod
+    def _day(dt):
+        return None if dt is None else dt.toordinal()
+
+    @property
+    def _today(self):
+        return self.reference.toordinal()
+
+    def _insert(self, seq, record):
+        join, leave = self._day(record.join_date), self._day(record.leave_date)
+        self._records[seq] = (record, join, leave)
+        insort(self._joins, join)
+        if leave is None:
+            insort(self._active, (join, seq))
         else:
-            return False
+            insort(self._left, (leave - join, seq))
+            insort(self._leaves, leave)
+            self._left_tree = None
 
-    def __add__(self, *others):
-        if self.leave_date:
-                raise ValueError(f'{self} is not working in the company anymore.')
-        for other in others:
-            if not isinstance(other, Employee):
-                raise TypeError('Unsupported operation between types {type(self)} and {type(other)}')
-            if other is self:
-                raise ValueError('Cannot team up the person to themselves.')
-            if other.leave_date:
-                raise ValueError(f'{other} is not working in the company anymore.')
-        
-        if (self, *others) in self.__class__.teams:
-            print('The team already exists.')
+    def _delete(self, seq):
+        record, join, leave = self._records.pop(seq)
+        self._joins.pop(bisect_left(self._joins, join))
+        if leave is None:
+            self._active.pop(bisect_left(self._active, (join, seq)))
         else:
-            self.__class__.teams.append((self, *others))
+            self._left.pop(bisect_left(self._left, (leave - join, seq)))
+            self._leaves.pop(bisect_left(self._leaves, leave))
+            self._left_tree = None
+        return record
+
+    def add(self, record):
+        if record.identity() in self._ids:
+            return
+        self._count += 1
+        self._ids[record.identity()] = self._count
+        self._insert(self._count, record)
+
+    def update(self, records):
+        '''Add many records at once, sorting the lists once instead of
+        inserting into them one by one.'''
+        for record in records:
+            if record.identity() in self._ids:
+                continue
+            self._count += 1
+            self._ids[record.identity()] = seq = self._count
+            join, leave = self._day(record.join_date), self._day(record.leave_date)
+            self._records[seq] = (record, join, leave)
+            self._joins.append(join)
+            if leave is None:
+                self._active.append((join, seq))
+            else:
+                self._left.append((leave - join, seq))
+                self._leaves.append(leave)
+                self._left_tree = None
+        for entries in (self._joins, self._active, self._left, self._leaves):
+            entries.sort()
+
+    def remove(self, record):
+        self._delete(self._ids.pop(record.identity()))
+
+    def _changed(self, record, attribute, old, new):
+        if attribute in ('join_date', 'leave_date'):
+            seq = self._ids.get(record.identity())
+            if seq is not None:
+                self._insert(seq, self._delete(seq))
+
+    def close(self):
+        '''Stop following the changes of the employees.'''
+        if self._changed in EmployeeRecord.listeners:
+            EmployeeRecord.listeners.remove(self._changed)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, record):
+        return record.identity() in self._ids
+
+    def tenure(self, record):
+        '''Days worked by the employee until leaving or the reference date.'''
+        _, join, leave = self._records[self._ids[record.identity()]]
+        return (self._today if leave is None else leave) - join
+
+    def _by_tenure(self, descending):
+        today = self._today
+        active = ((today - join, seq) for join, seq in (self._active if descending else reversed(self._active)))
+        left = reversed(self._left) if descending else iter(self._left)
+        for _, seq in heapq.merge(active, left, key=lambda entry: entry[0], reverse=descending):
+            yield self._records[seq][0]
+
+    def by_tenure(self, descending=False):
+        '''All employees sorted by tenure.'''
+        return list(self._by_tenure(descending))
+
+    def longest(self, k):
+        '''The k longest-tenured employees, longest first, in O(k).'''
+        return list(islice(self._by_tenure(True), k))
+
+    def worked_between(self, min_days, max_days):
+        '''Employees whose tenure is between min_days and max_days
+        (inclusive), in O(log n) plus the number of results.'''
+        today = self._today
+        start = bisect_left(self._active, (today - max_days,))
+        end = bisect_left(self._active, (today - min_days + 1,))
+        found = [self._records[seq][0] for _, seq in self._active[start:end]]
+        start = bisect_left(self._left, (min_days,))
+        end = bisect_left(self._left, (max_days + 1,))
+        found.extend(self._records[seq][0] for _, seq in self._left[start:end])
+        return found
+
+    def active_count(self, date):
+        '''Number of employees who had joined and not yet left on the date
+        (a leave date is the last day worked), in O(log n).'''
+        day = date.toordinal()
+        return bisect_right(self._joins, day) - bisect_left(self._leaves, day)
+
+    @staticmethod
+    def _build_tree(intervals):
+        '''Centered interval tree of (join day, leave day, sequence number)
+        intervals: a node is (center, the intervals holding the center by
+        join ascending, the same by leave descending, the tree of those
+        ending before the center, the tree of those starting after it).'''
+        if not intervals:
+            return None
+        ends = sorted(day for interval in intervals for day in interval[:2])
+        center = ends[len(ends) // 2]
+        before = [interval for interval in intervals if interval[1] < center]
+        after = [interval for interval in intervals if interval[0] > center]
+        holding = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return (center, sorted((join, seq) for join, _, seq in holding),
+                sorted(((leave, seq) for _, leave, seq in holding), reverse=True),
+                TenureIndex._build_tree(before), TenureIndex._build_tree(after))
+
+    def _left_on(self, day):
+        '''Sequence numbers of those who left but were working on the day,
+        in O(log n) plus the number of results.'''
+        if self._left_tree is None and self._left:
+            self._left_tree = self._build_tree([self._records[seq][1:] + (seq,) for _, seq in self._left])
+        node = self._left_tree
+        while node is not None:
+            center, by_join, by_leave, before, after = node
+            if day < center:
+                for join, seq in by_join:
+                    if join > day:
+                        break
+                    yield seq
+                node = before
+            else:
+                for leave, seq in by_leave:
+                    if leave < day:
+                        break
+                    yield seq
+                node = after if day > center else None
+
+    def active_on(self, date):
+        '''Employees who had joined and not yet left on the date: the
+        prefix of those still working who joined by then, found by bisection,
+        and those who left whose working days hold the date, from the
+        interval tree. O(log n) plus the number of results.'''
+        day = date.toordinal()
+        found = [self._records[seq][0] for _, seq in self._active[:bisect_left(self._active, (day + 1,))]]
+        found.extend(self._records[seq][0] for seq in self._left_on(day))
+        return found
@@ -1,3 +1,13 @@
+import json
+import multiprocessing
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain, permutations
+from math import perm
+
+
 def k_combs(k):
     nums = set(range(10))
     if k == 1:
@@ -14,8 +24,52 @@ def word_to_num(word,lookup_dict):
     number = ''.join(str(lookup_dict[ch]) for ch in word)
     return number
 
-def sum_puzzle(text):
-    letters = {ch for ch in text if ch.isalpha()}
+# The letters of the puzzle in the order they first appear
+def puzzle_letters(text):
+    return list(dict.fromkeys(ch for ch in text if ch.isalpha()))
+
+# Words of the puzzle and the sign each one is added with: the words before '=' with their operator, the result with -1,
+# so that the puzzle holds when the signed sum of the words is 0
+def parse_puzzle(text):
+    words = ['']
+    signs = [1]
+    for ch in text:
+        if ch.isalpha():
+            words[-1] += ch
+        elif ch in {'+', '-'}:
+            words.append('')
+            signs.append(1 if ch == '+' else -1)
+        elif ch == '=':
+            words.append('')
+            signs.append(-1)
+    return words, signs
+
+# Every ordering of 'k' distinct digits in lexicographic order, as one list changed in place (copy it to keep it)
+def digit_permutations(k):
+    digits = [-1] * k
+    used = [False] * 10
+    position = 0
+    while position >= 0:
+        digit = digits[position]
+        if digit >= 0:
+            used[digit] = False
+        digit += 1
+        while digit < 10 and used[digit]:
+            digit += 1
+        if digit == 10:
+            digits[position] = -1
+            position -= 1
+            continue
+        digits[position] = digit
+        used[digit] = True
+        if position == k - 1:
+            yield digits
+        else:
+            position += 1
+
+# The search of the original 'sum_puzzle': every assignment of distinct digits to the letters, checked one by one
+def brute_force_puzzle(text):
+    letters = puzzle_letters(text)
     if len(letters) > 10:
         print('Too many distinct letters (>10).')
         return
@@ -33,13 +87,11 @@ def sum_puzzle(text):
     res = []
     for comb in combs:
         mapping = dict(zip(letters, comb))
-        # if mapping == {'T':9, 'R':8, 'A':7, 'N':6, 'H':5, 'Y':4, 'S':3, 'M':2, 'O':1, 'E':0}:
-        #     print('here')
         zero_start = 0
         num_operands = []
         for operand in operands:
             num_operand = word_to_num(operand, mapping)
-            if num_operand[0] == 0:
+            if num_operand[0] == '0':
                 zero_start = 1
                 break
             else:
@@ -52,7 +104,324 @@ def sum_puzzle(text):
                 res.append(mapping)
     return res
 
-a = sum_puzzle('''SO+MANY+MORE+MEN+SEEM+TO+SAY+THAT+THEY+MAY+SOON+TRY+TO+STAY+AT+HOME+
-                SO+AS+TO+SEE+OR+HEAR+THE+SAME+ONE+MAN+TRY+TO+MEET+THE+TEAM+ON+THE+
-                MOON+AS+HE+HAS+AT+THE+OTHER+TEN=TESTS''')
-print(a, len(a))
\ No newline at end of file
+# The search of 'brute_force_puzzle' as a generator over 'digit_permutations': the words are weighed with 'letter_weights'
+# instead of joined and parsed, and nothing is kept but the solutions
+def iter_brute_force(text):
+    letters, weights, leading = letter_weights(text)
+    leading = [i for i, letter in enumerate(letters) if letter in leading]
+    pairs = list(zip(weights, range(len(letters))))
+    for digits in digit_permutations(len(letters)):
+        if sum(weight * digits[i] for weight, i in pairs) == 0 and all(digits[i] for i in leading):
+            yield dict(zip(letters, digits))
+
+# Inverses of the digits coprime to 10, modulo 10
+inverse_mod_10 = {1: 1, 3: 7, 7: 3, 9: 9}
+
+# Plan of the column-wise search: for every column from the last digit on, the letters first met in it that are tried
+# one digit after another, the letter whose digit then follows from the column sum (one with a coefficient coprime to
+# 10, or None) with its coefficient, and the summed coefficients of the other letters of the column
+def column_plan(words, signs):
+    plan = []
+    assigned = set()
+    for column in range(max(len(word) for word in words)):
+        coefficients = {}
+        for word, sign in zip(words, signs):
+            if column < len(word):
+                letter = word[-1 - column]
+                coefficients[letter] = coefficients.get(letter, 0) + sign
+        new = [letter for letter in coefficients if letter not in assigned]
+        solved = next((letter for letter in reversed(new) if coefficients[letter] % 10 in inverse_mod_10), None)
+        plan.append(([letter for letter in new if letter != solved], solved, coefficients.get(solved),
+                     [(letter, coefficient) for letter, coefficient in coefficients.items() if letter != solved]))
+        assigned.update(new)
+    return plan
+
+# Solutions as {letter: digit}, found column by column from the last digits: the digits of a column's new letters are
+# tried, the carry goes on to the next column and a partial assignment is dropped as soon as a column does not add up.
+# Digits are never 0 for the first letter of a word. The letters of 'fixed' ({letter: digit}) only get their digit, and
+# the search ends early once the 'stop' event (a threading / multiprocessing Event) is set.
+def solve_columns(text, fixed=None, stop=None):
+    words, signs = parse_puzzle(text)
+    plan = column_plan(words, signs)
+    leading = {word[0] for word in words if word}
+    fixed = fixed or {}
+    digits = {}
+    used = [False] * 10
+    steps = [0]
+
+    def column(index, carry):
+        if stop is not None:
+            steps[0] += 1
+            if steps[0] % 1024 == 0 and stop.is_set():
+                return
+        if index == len(plan):
+            if carry == 0:
+                yield dict(digits)
+            return
+        yield from choose(index, carry, 0)
+
+    def choose(index, carry, position):
+        free, solved, coefficient, coefficients = plan[index]
+        if position < len(free):
+            letter = free[position]
+            if letter in fixed:
+                candidates = (fixed[letter],)
+            else:
+                candidates = range(1 if letter in leading else 0, 10)
+            for digit in candidates:
+                if not used[digit]:
+                    used[digit] = True
+                    digits[letter] = digit
+                    yield from choose(index, carry, position + 1)
+                    used[digit] = False
+            digits.pop(letter, None)
+            return
+        total = carry + sum(coefficient * digits[letter] for letter, coefficient in coefficients)
+        if solved is None:
+            if total % 10 == 0:
+                yield from column(index + 1, total // 10)
+            return
+        digit = -total * inverse_mod_10[coefficient % 10] % 10
+        if used[digit] or (digit == 0 and solved in leading) or fixed.get(solved, digit) != digit:
+            return
+        used[digit] = True
+        digits[solved] = digit
+        yield from column(index + 1, (total + coefficient * digit) // 10)
+        used[digit] = False
+        del digits[solved]
+
+    return column(0, 0)
+
+# Letters of the puzzle in the order they first appear, the weight of each in the signed sum of the words (its place
+# values added up over the words, so that the puzzle holds when the weighted sum of the digits is 0) and the first
+# letters of the words
+def letter_weights(text):
+    words, signs = parse_puzzle(text)
+    letters = puzzle_letters(text)
+    weights = dict.fromkeys(letters, 0)
+    for word, sign in zip(words, signs):
+        for position, letter in enumerate(reversed(word)):
+            weights[letter] += sign * 10 ** position
+    return letters, [weights[letter] for letter in letters], {word[0] for word in words if word}
+
+# All the orderings of 'r' of the positions 0 ... n-1, one per row
+@lru_cache(maxsize=8)
+def permutation_table(n, r):
+    import numpy as np
+    return np.fromiter(chain.from_iterable(permutations(range(n), r)), dtype=np.int8, count=perm(n, r) * r).reshape(-1, r)
+
+# Solutions as {letter: digit} found by weighing digit assignments with numpy, a batch at a time: the first letters get
+# every assignment of distinct digits in turn, and for each the last letters get all the assignments of the remaining
+# digits at once, as rows of a matrix multiplied with their weights. A batch holds at most 'batch_size' assignments
+# (taking as many of the last letters as fit), so memory does not grow with the number of letters. Puzzles with words so
+# long that a sum of weights could overflow int64 are left to 'solve_columns'.
+def solve_vectorized(text, batch_size=1_000_000):
+    import numpy as np
+    letters, weights, leading = letter_weights(text)
+    if not letters:
+        return
+    if 9 * sum(abs(weight) for weight in weights) > np.iinfo(np.int64).max:
+        yield from solve_columns(text)
+        return
+    last = max(r for r in range(1, len(letters) + 1) if perm(10 - len(letters) + r, r) <= batch_size or r == 1)
+    first = len(letters) - last
+    table = permutation_table(10 - first, last)
+    first_weights = weights[:first]
+    last_weights = np.array(weights[first:], dtype=np.int64)
+    last_leading = [i for i, letter in enumerate(letters[first:]) if letter in leading]
+    for prefix in permutations(range(10), first):
+        if any(digit == 0 and letter in leading for letter, digit in zip(letters, prefix)):
+            continue
+        remaining = np.array([digit for digit in range(10) if digit not in prefix], dtype=np.int8)
+        digits = remaining[table]
+        found = digits @ last_weights == -sum(w * d for w, d in zip(first_weights, prefix))
+        if last_leading:
+            found &= (digits[:, last_leading] != 0).all(axis=1)
+        for row in digits[found].tolist():
+            yield dict(zip(letters, (*prefix, *row)))
+
+# Solutions of the puzzle as {letter: digit} (letters in the order they first appear), each as soon as it is found
+def iter_solutions(text, backend='columns'):
+    letters = puzzle_letters(text)
+    if len(letters) > 10:
+        print('Too many distinct letters (>10).')
+        return
+    if backend == 'columns':
+        solutions = solve_columns(text)
+    elif backend == 'numpy':
+        solutions = solve_vectorized(text)
+    else:
+        raise ValueError(f'backend should be "columns" or "numpy", not {backend!r}.')
+    for solution in solutions:
+        yield {letter: solution[letter] for letter in letters}
+
+def sum_puzzle(text, backend='columns'):
+    if len(puzzle_letters(text)) > 10:
+        print('Too many distinct letters (>10).')
+        return
+    res = list(iter_solutions(text, backend))
+    res.sort(key=lambda mapping: list(mapping.values()))
+    return res
+
+# Event telling the shard workers of 'sum_puzzle_parallel' to stop, set up when each worker process starts
+shard_stop = None
+
+def _start_shard_worker(stop):
+    global shard_stop
+    shard_stop = stop
+
+def _solve_shard(text, fixed, count_only):
+    solutions = solve_columns(text, fixed, shard_stop)
+    if count_only:
+        return sum(1 for _ in solutions)
+    return list(solutions)
+
+# Parts of the search of a puzzle: every assignment of distinct digits to its first 'shard_letters' letters (a leading
+# letter first), in lexicographic order, without zeros on the first letters of words
+def puzzle_shards(text, shard_letters=2):
+    words, _ = parse_puzzle(text)
+    leading = {word[0] for word in words if word}
+    letters = puzzle_letters(text)[:shard_letters]
+    return [dict(zip(letters, digits)) for digits in permutations(range(10), len(letters))
+            if not any(digit == 0 and letter in leading for letter, digit in zip(letters, digits))]
+
+# Results of the shards as (shard index, solutions or count) pairs, as the shards finish in a pool of 'workers'
+# processes. Closing the generator cancels the shards not started and stops the running ones.
+def shard_results(text, workers=None, shard_letters=2, count_only=False):
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=_start_shard_worker, initargs=(stop,)) as executor:
+        futures = {executor.submit(_solve_shard, text, fixed, count_only): index
+                   for index, fixed in enumerate(puzzle_shards(text, shard_letters))}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+
+# Solutions as {letter: digit} in any order, streamed as the shards finish
+def parallel_solutions(text, workers=None, shard_letters=2):
+    for _, solutions in shard_results(text, workers, shard_letters):
+        yield from solutions
+
+# 'sum_puzzle' over several processes. With 'mode' "all" the same list as 'sum_puzzle', with "count" its length and with
+# "first" its first mapping (None without solutions), cancelling the shards that cannot hold it.
+def sum_puzzle_parallel(text, mode='all', workers=None, shard_letters=2):
+    letters = puzzle_letters(text)
+    if len(letters) > 10:
+        print('Too many distinct letters (>10).')
+        return
+    if mode == 'count':
+        return sum(count for _, count in shard_results(text, workers, shard_letters, count_only=True))
+    if mode == 'all':
+        res = [{letter: solution[letter] for letter in letters} for solution in parallel_solutions(text, workers,
+                                                                                                   shard_letters)]
+        res.sort(key=lambda mapping: list(mapping.values()))
+        return res
+    if mode != 'first':
+        raise ValueError(f'mode should be "all", "count" or "first", not {mode!r}.')
+    # The shards are in lexicographic order, so the first solution is the smallest one of the first shard with any
+    done = {}
+    lowest = 0
+    results = shard_results(text, workers, shard_letters)
+    try:
+        for index, solutions in results:
+            done[index] = solutions
+            while lowest in done and not done[lowest]:
+                lowest += 1
+            if done.get(lowest):
+                first = min(({letter: solution[letter] for letter in letters} for solution in done[lowest]),
+                            key=lambda mapping: list(mapping.values()))
+                return first
+    finally:
+        results.close()
+    return None
+
+# The puzzle with its letters renamed A, B, C, ... in the order they first appear and nothing but letters and operators
+# kept, the same for all the puzzles that only differ in their letters. Solutions of this form list the digits in the
+# order of the letters of the puzzle.
+def canonical_puzzle(text):
+    names = dict(zip(puzzle_letters(text), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    return ''.join(names.get(ch, ch) for ch in text if ch.isalpha() or ch in {'+', '-', '='})
+
+# Solutions of canonical puzzles, as tuples of digit tuples: the 'maxsize' used last in memory and, with a 'path', all
+# of them in a SQLite file that outlives the process
+class PuzzleCache:
+    def __init__(self, path=None, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._solutions = OrderedDict()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS puzzles (canonical TEXT PRIMARY KEY, solutions TEXT NOT NULL)')
+
+    def _remember(self, canonical, solutions):
+        self._solutions[canonical] = solutions
+        self._solutions.move_to_end(canonical)
+        if len(self._solutions) > self.maxsize:
+            self._solutions.popitem(last=False)
+
+    def get(self, canonical):
+        solutions = self._solutions.get(canonical)
+        if solutions is None and self._db is not None:
+            row = self._db.execute('SELECT solutions FROM puzzles WHERE canonical = ?', (canonical,)).fetchone()
+            if row is not None:
+                solutions = tuple(map(tuple, json.loads(row[0])))
+        if solutions is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(canonical, solutions)
+        return solutions
+
+    def put(self, canonical, solutions):
+        self._remember(canonical, solutions)
+        if self._db is not None:
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO puzzles VALUES (?, ?)', (canonical, json.dumps(solutions)))
+
+    def clear(self):
+        self._solutions.clear()
+        self.hits = self.misses = 0
+        if self._db is not None:
+            with self._db:
+                self._db.execute('DELETE FROM puzzles')
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self):
+        return len(self._solutions)
+
+puzzle_cache = PuzzleCache()
+
+# 'sum_puzzle' of every puzzle of 'texts', solving each canonical form once ('cache', 'puzzle_cache' by default) and
+# giving its solutions the letters of each puzzle. None for a puzzle of more than 10 letters.
+def solve_batch(texts, cache=None, backend='columns'):
+    cache = puzzle_cache if cache is None else cache
+    results = []
+    for text in texts:
+        letters = puzzle_letters(text)
+        if len(letters) > 10:
+            print('Too many distinct letters (>10).')
+            results.append(None)
+            continue
+        canonical = canonical_puzzle(text)
+        solutions = cache.get(canonical)
+        if solutions is None:
+            solutions = tuple(tuple(mapping.values()) for mapping in sum_puzzle(canonical, backend))
+            cache.put(canonical, solutions)
+        results.append([dict(zip(letters, digits)) for digits in solutions])
+    return results
+
+
+if __name__ == '__main__':
+    a = sum_puzzle('''SO+MANY+MORE+MEN+SEEM+TO+SAY+THAT+THEY+MAY+SOON+TRY+TO+STAY+AT+HOME+
+                    SO+AS+TO+SEE+OR+HEAR+THE+SAME+ONE+MAN+TRY+TO+MEET+THE+TEAM+ON+THE+
+                    MOON+AS+HE+HAS+AT+THE+OTHER+TEN=TESTS''')
+    print(a, len(a))
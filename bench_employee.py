@@ -0,0 +1,408 @@
+import asyncio
+import csv
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from itertools import combinations
+from string import ascii_lowercase
+
+from Employee_class import EmailAllocator, Employee, EmployeeTable, TeamRegistry, TenureIndex
+from employee_analytics import WorkforceAnalytics
+from employee_history import ChangeLog
+from employee_import import fields, import_employees
+from employee_store import EmployeeStore
+from employee_teams import TeamSearch
+
+
+"""
+Benchmarks for 'Employee_class'. Run the file directly to print the timings:
+
+    python bench_employee.py
+"""
+
+# Letters-only name for the number 'i', so that every employee gets a distinct valid work email
+def letters(i, length=6):
+    name = ''
+    for _ in range(length):
+        i, r = divmod(i, 26)
+        name += ascii_lowercase[r]
+    return name
+
+# Arguments of 'n' distinct employees
+def employee_args(n, seed=0):
+    rng = random.Random(seed)
+    return [(letters(i).capitalize(), letters(i + 7919 * n).capitalize(),
+             f'{rng.randint(1, 28):02}.{rng.randint(1, 12):02}.{rng.randint(2000, 2020)}',
+             rng.randint(10000, 5000000), rng.choice('MF')) for i in range(n)]
+
+def make_employees(n, seed=0):
+    return [Employee(*args) for args in employee_args(n, seed)]
+
+# Random distinct teams of 2 to 4 members
+def random_teams(employees, n_teams, seed=0):
+    rng = random.Random(seed)
+    teams = {}  # Employee is not hashable, so the teams are told apart by the ids of their members
+    while len(teams) < n_teams:
+        team = tuple(rng.sample(employees, rng.randint(2, 4)))
+        teams[frozenset(map(id, team))] = team
+    return list(teams.values())
+
+# Team creation as done before 'TeamRegistry': a scan of a list of tuples comparing members by tenure
+def legacy_add(teams, members):
+    if members in teams:
+        return False
+    teams.append(members)
+    return True
+
+def bench_teams(n_teams=100_000, n_employees=5_000, n_legacy=2_000):
+    employees = make_employees(n_employees)
+    teams = random_teams(employees, n_teams)
+    print(f'{n_teams} teams of {n_employees} employees')
+
+    registry = TeamRegistry()
+    start = time.perf_counter()
+    for team in teams:
+        registry.add(team)
+    elapsed = time.perf_counter() - start
+    print(f'  TeamRegistry create      {elapsed:8.3f} s {elapsed / n_teams * 1e6:10.2f} us/team')
+
+    start = time.perf_counter()
+    for team in teams:
+        assert team in registry
+    elapsed = time.perf_counter() - start
+    print(f'  TeamRegistry duplicate   {elapsed:8.3f} s {elapsed / n_teams * 1e6:10.2f} us/team')
+
+    start = time.perf_counter()
+    for employee in employees:
+        registry.teams_of(employee)
+    elapsed = time.perf_counter() - start
+    print(f'  TeamRegistry teams_of    {elapsed:8.3f} s {elapsed / n_employees * 1e6:10.2f} us/employee')
+
+    legacy = []
+    start = time.perf_counter()
+    for team in teams[:n_legacy]:
+        legacy_add(legacy, team)
+    elapsed = time.perf_counter() - start
+    print(f'  list scan, {n_legacy} teams  {elapsed:8.3f} s {elapsed / n_legacy * 1e6:10.2f} us/team '
+          f'(grows with the number of teams)')
+
+# Memory taken by 'n' employees as Employee objects and as rows of an EmployeeTable
+def bench_table_memory(n=50_000):
+    print(f'{n} employees')
+    for name in ('Employee', 'EmployeeTable'):
+        args = employee_args(n, seed=n)
+        Employee.emails.clear()
+        tracemalloc.start()
+        start = time.perf_counter()
+        if name == 'Employee':
+            employees = [Employee(*row) for row in args]
+        else:
+            employees = EmployeeTable()
+            for row in args:
+                employees.append(*row)
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f'  {name:<14} {size / 2 ** 20:8.1f} MB {size / n:8.0f} bytes/employee {elapsed:8.3f} s')
+        del employees
+
+# Write a CSV file of 'n' employees, every 'bad'th row with an invalid salary
+def write_employee_csv(path, n, bad=100, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(fields)
+        for i, (first_name, last_name, join_date, salary, gender) in enumerate(employee_args(n, seed)):
+            leave_date = f'{rng.randint(1, 28):02}.{rng.randint(1, 12):02}.2021' if i % 3 == 0 else ''
+            phone_number = f'099 {i % 100:02} {i // 100 % 100:02} {rng.randint(0, 99):02}' if i % 2 else ''
+            writer.writerow((first_name, last_name, join_date, 5 if i % bad == 0 else salary, gender, leave_date,
+                             phone_number, rng.choice(('True', 'False'))))
+
+# Rows per minute of 'import_employees' on a CSV of 'n' rows and of the Employee constructor on 'n_objects' of them
+def bench_import(n=500_000, n_objects=20_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'employees.csv')
+        write_employee_csv(path, n)
+        print(f'import of {n} CSV rows')
+
+        Employee.emails.clear()
+        start = time.perf_counter()
+        table, report = import_employees(path)
+        elapsed = time.perf_counter() - start
+        print(f'  import_employees    {elapsed:8.3f} s {n / elapsed * 60:12.0f} rows/min   {report}')
+
+        Employee.emails.clear()
+        with open(path, newline='') as file:
+            rows = [row for _, row in zip(range(n_objects), csv.DictReader(file))]
+        start = time.perf_counter()
+        for row in rows:
+            try:
+                Employee(row['first_name'], row['last_name'], row['join_date'], int(row['salary']), row['gender'],
+                         row['leave_date'] or None, row['phone_number'] or None, row['trial_passed'] == 'True')
+            except ValueError:
+                pass
+        elapsed = time.perf_counter() - start
+        print(f'  Employee(...)       {elapsed:8.3f} s {n_objects / elapsed * 60:12.0f} rows/min ({n_objects} rows)')
+
+# Sorting by tenure with the comparison operators of Employee against building a TenureIndex and reading it sorted
+def bench_tenure(n=50_000):
+    Employee.emails.clear()
+    employees = make_employees(n)
+    print(f'{n} employees by tenure')
+
+    start = time.perf_counter()
+    sorted(employees)
+    elapsed = time.perf_counter() - start
+    print(f'  sorted(employees)        {elapsed:8.3f} s')
+
+    start = time.perf_counter()
+    index = TenureIndex(employees)
+    elapsed = time.perf_counter() - start
+    print(f'  TenureIndex build        {elapsed:8.3f} s')
+
+    start = time.perf_counter()
+    index.by_tenure()
+    index.longest(100)
+    index.worked_between(1000, 2000)
+    elapsed = time.perf_counter() - start
+    print(f'  sorted + longest + range {elapsed:8.3f} s')
+    index.close()
+
+# As-of figures by scanning all employees, as done without WorkforceAnalytics
+def scan_as_of(employees, date):
+    working = [e for e in employees if e.join_date <= date and (e.leave_date is None or e.leave_date >= date)]
+    women = sum(e.gender == 'F' for e in working)
+    return {'headcount': len(working), 'payroll': sum(e.salary for e in working), 'M': len(working) - women,
+            'F': women}
+
+def bench_analytics(n=50_000, n_queries=200, seed=0):
+    Employee.emails.clear()
+    employees = make_employees(n)
+    rng = random.Random(seed)
+    for employee in employees[::3]:
+        employee.leave_date = (employee.join_date + timedelta(days=rng.randint(0, 3000))).strftime('%d.%m.%Y')
+    dates = [datetime(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)) for _ in range(n_queries)]
+    print(f'{n} employees, {n_queries} as-of dates')
+
+    start = time.perf_counter()
+    for date in dates:
+        scan_as_of(employees, date)
+    elapsed = time.perf_counter() - start
+    print(f'  scan as_of               {elapsed:8.3f} s')
+
+    start = time.perf_counter()
+    analytics = WorkforceAnalytics(employees)
+    elapsed = time.perf_counter() - start
+    print(f'  WorkforceAnalytics build {elapsed:8.3f} s')
+
+    start = time.perf_counter()
+    for date in dates:
+        analytics.as_of(date)
+    elapsed = time.perf_counter() - start
+    print(f'  WorkforceAnalytics as_of {elapsed:8.3f} s')
+
+    start = time.perf_counter()
+    series = analytics.monthly()
+    elapsed = time.perf_counter() - start
+    print(f'  monthly series           {elapsed:8.3f} s ({len(series)} months)')
+
+    start = time.perf_counter()
+    for employee in employees[:1000]:
+        employee.salary = max(10000, employee.salary - 1000)
+    elapsed = time.perf_counter() - start
+    print(f'  1000 salary changes      {elapsed:8.3f} s')
+    analytics.close()
+
+# Allocating 'n' addresses over 'n_bases' base names, then releasing and allocating again every tenth of them
+def bench_emails(n=1_000_000, n_bases=10_000):
+    allocator = EmailAllocator()
+    bases = [f'{letters(i)}.{letters(i * 31 + 7)}' for i in range(n_bases)]
+    print(f'{n} emails over {n_bases} base names')
+
+    start = time.perf_counter()
+    emails = [allocator.allocate(bases[i % n_bases]) for i in range(n)]
+    elapsed = time.perf_counter() - start
+    print(f'  allocate                 {elapsed:8.3f} s {elapsed / n * 1e6:8.2f} us/email')
+
+    start = time.perf_counter()
+    for email in emails[::10]:
+        allocator.release(email)
+    for email in emails[::10]:
+        allocator.allocate(email.rpartition('@')[0].rstrip('0123456789'))
+    elapsed = time.perf_counter() - start
+    print(f'  release + allocate       {elapsed:8.3f} s {elapsed / (n // 10) * 1e6:8.2f} us/email')
+    assert len(allocator) == n
+
+# Startup from an EmployeeStore of 'n' employees against re-running the constructors, then lazy reads and batched writes
+def bench_store(n=100_000, n_reads=10_000, n_threads=4, seed=0):
+    rng = random.Random(seed)
+    args = employee_args(n, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'employees.sqlite')
+        Employee.emails.clear()
+        employees = [Employee(*row) for row in args]
+        print(f'EmployeeStore of {n} employees')
+
+        start = time.perf_counter()
+        with EmployeeStore(path) as store:
+            store.add_many(employees)
+        elapsed = time.perf_counter() - start
+        print(f'  batched inserts          {elapsed:8.3f} s {n / elapsed:10.0f} rows/s')
+        del employees, store
+
+        Employee.emails.clear()
+        start = time.perf_counter()
+        [Employee(*row) for row in args]
+        elapsed = time.perf_counter() - start
+        print(f'  re-run the constructors  {elapsed:8.3f} s')
+
+        Employee.emails.clear()
+        start = time.perf_counter()
+        store = EmployeeStore(path)
+        elapsed = time.perf_counter() - start
+        print(f'  open the store           {elapsed:8.3f} s')
+
+        ids = [rng.randint(1, n) for _ in range(n_reads)]
+        start = time.perf_counter()
+        employees = [store.get(employee_id) for employee_id in ids]
+        elapsed = time.perf_counter() - start
+        print(f'  get, lazy                {elapsed:8.3f} s {elapsed / n_reads * 1e6:8.2f} us/employee')
+
+        def read(chunk):
+            for employee in chunk:
+                store.find(work_email=employee.work_email)
+
+        chunks = [employees[i::n_threads] for i in range(n_threads)]
+        threads = [threading.Thread(target=read, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(f'  find by email, {n_threads} threads {elapsed:8.3f} s {elapsed / n_reads * 1e6:8.2f} us/query')
+
+        start = time.perf_counter()
+        for employee in employees:
+            employee.salary = max(10000, employee.salary - 1000)
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f'  batched updates          {elapsed:8.3f} s {n_reads / elapsed:10.0f} changes/s')
+        store.close()
+
+# Threads creating employees of 'n_bases' shared names and teams from a shared pool at once, for growing numbers of
+# threads: throughput, and the duplicate emails and teams found afterwards (there should be none)
+def bench_concurrency(n=40_000, n_bases=200, n_teams=40_000, thread_counts=(1, 2, 4, 8), seed=0):
+    pool = make_employees(500, seed)
+    names = [(letters(i).capitalize(), letters(i * 31 + 7).capitalize()) for i in range(n_bases)]
+    print(f'{n} employees over {n_bases} names and {n_teams} team attempts, by thread count')
+    for n_threads in thread_counts:
+        Employee.emails.clear()
+        registry = TeamRegistry()
+        rng = random.Random(seed)
+        attempts = [tuple(rng.sample(pool, 3)) for _ in range(n_teams)]
+        created = [[] for _ in range(n_threads)]
+        added = [0] * n_threads
+
+        def work(thread):
+            for i in range(thread, n, n_threads):
+                created[thread].append(Employee(*names[i % n_bases], '01.01.2010', 50000, 'M'))
+            for i in range(thread, n_teams, n_threads):
+                added[thread] += registry.add(attempts[i])
+
+        threads = [threading.Thread(target=work, args=(thread,)) for thread in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        emails = [employee.work_email for employees in created for employee in employees]
+        duplicate_emails = len(emails) - len(set(emails))
+        duplicate_teams = sum(added) - len({frozenset(map(id, team)) for team in attempts})
+        print(f'  {n_threads} threads {elapsed:8.3f} s {(n + n_teams) / elapsed:10.0f} ops/s   '
+              f'duplicate emails {duplicate_emails}, duplicate teams {duplicate_teams}')
+
+    async def create(count):
+        return await asyncio.gather(*(Employee.create_async(*names[i % n_bases], '01.01.2010', 50000, 'M')
+                                      for i in range(count)))
+
+    Employee.emails.clear()
+    start = time.perf_counter()
+    employees = asyncio.run(create(n // 10))
+    elapsed = time.perf_counter() - start
+    emails = [employee.work_email for employee in employees]
+    print(f'  asyncio  {elapsed:8.3f} s {len(emails) / elapsed:10.0f} ops/s   '
+          f'duplicate emails {len(emails) - len(set(emails))}')
+
+# 'n_events' salary changes of 'n' employees written at once to a ChangeLog with snapshots every 'interval' events and
+# to one without snapshots, then the state at 'n_queries' random times rebuilt from each
+def bench_history(n=10_000, n_events=1_000_000, interval=100_000, n_queries=10, seed=0):
+    rng = random.Random(seed)
+    Employee.emails.clear()
+    employees = make_employees(n, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = {'snapshots': ChangeLog(os.path.join(tmp, 'snapshots'), interval),
+                'log only': ChangeLog(os.path.join(tmp, 'log'), n_events * 2)}
+        print(f'{n_events} changes of {n} employees, snapshots every {interval}')
+        start = time.perf_counter()
+        times = []
+        for i in range(n_events):
+            employees[rng.randrange(n)].salary = rng.randint(10000, 5000000)
+            if i % (n_events // n_queries) == 0:
+                times.append(time.time())
+        elapsed = time.perf_counter() - start
+        print(f'  write to both logs       {elapsed:8.3f} s {elapsed / n_events * 1e6:8.2f} us/change')
+
+        states = {}
+        for name, log in logs.items():
+            start = time.perf_counter()
+            states[name] = [log.state_at(when) for when in times]
+            elapsed = time.perf_counter() - start
+            print(f'  state_at, {name:<14} {elapsed / len(times):8.3f} s/query')
+            log.close()
+        assert states['snapshots'] == states['log only']
+
+# Teams of 'k' of 'n' employees within a salary budget and the 10 of longest tenure, by checking every combination
+# and with TeamSearch
+def bench_team_search(n=200, k=3, budget=1_500_000, n_top=10):
+    Employee.emails.clear()
+    employees = make_employees(n)
+    reference = datetime.today()
+    print(f'teams of {k} of {n} employees, budget {budget}')
+
+    start = time.perf_counter()
+    within = [team for team in combinations(employees, k) if sum(e.salary for e in team) <= budget]
+    best = sorted((sum((reference - e.join_date).days for e in team) for team in within), reverse=True)[:n_top]
+    elapsed = time.perf_counter() - start
+    print(f'  all combinations         {elapsed:8.3f} s ({len(within)} teams within the budget)')
+
+    start = time.perf_counter()
+    search = TeamSearch(employees, reference)
+    found = sum(1 for _ in search.teams(k, max_salary=budget))
+    elapsed = time.perf_counter() - start
+    print(f'  TeamSearch.teams         {elapsed:8.3f} s ({found} teams)')
+
+    start = time.perf_counter()
+    top = search.top(n_top, k, max_salary=budget)
+    elapsed = time.perf_counter() - start
+    print(f'  TeamSearch.top({n_top})       {elapsed:8.3f} s')
+    assert found == len(within) and [score for score, _ in top] == best
+
+
+if __name__ == '__main__':
+    bench_teams()
+    bench_table_memory()
+    bench_import()
+    bench_tenure()
+    bench_analytics()
+    bench_emails()
+    bench_store()
+    bench_concurrency()
+    bench_history()
+    bench_team_search()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import test_operations_new as ton
+
+
+"""
+Benchmarks for the operation-matrix testers in 'test_operations_new'. Run the file directly to print the timings:
+
+    python bench_operations.py
+"""
+
+# Runs the full 'selves' x 'others' matrix of binary operations the way 'binary_ops_test' does (without the dataframes
+# and the Excel output). 'compiled' switches between re-compiling the source text for every cell and 'compile_expr'.
+def binary_ops_matrix(selves=ton.def_objects, others=ton.def_objects, operations=ton.def_bin_ops, compiled=True):
+    for operation in operations:
+        exec_str = 'pass'
+        if operation.startswith('IP_'):
+            exec_str = f'copy_self_ {operations[operation]} copy_other'
+            eval_str = 'copy_self_'
+        else:
+            eval_str = f'copy_self_ {operations[operation]} copy_other'
+        if compiled:
+            exec_str = ton.compile_expr(exec_str, 'exec')
+            eval_str = ton.compile_expr(eval_str)
+
+        for self_ in selves:
+            for other in others:
+                copy_self_ = ton.try_deep_copy(selves[self_])
+                copy_other = ton.try_deep_copy(others[other])
+                ton.try_exec_eval(exec_str, eval_str, copy_self_, copy_other)
+
+def bench_compile_cache(repeat=3):
+    cells = len(ton.def_objects) ** 2 * len(ton.def_bin_ops)
+    print(f'def_objects x def_bin_ops: {cells} cells')
+    for compiled in (False, True):
+        best = None
+        for _ in range(repeat):
+            ton.compile_expr.cache_clear()
+            start = time.perf_counter()
+            binary_ops_matrix(compiled=compiled)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'  {"compile once" if compiled else "compile per cell":<17} {best:8.3f} s')
+
+# Peak traced memory of 'binary_meth_test' writing through dataframes and streaming the sheets ('stream'), for growing
+# numbers of methods. The streaming peak only grows by openpyxl's own bookkeeping per sheet (shared strings, temporary
+# file writers), the dataframe peak by all the results.
+def bench_stream_memory(counts=(10, 40, len(ton.def_methods)), n_objects=30):
+    objects = dict(list(ton.def_objects.items())[:n_objects])
+    print(f'binary_meth_test peak memory, {n_objects} x {n_objects} objects')
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            methods = dict(list(ton.def_methods.items())[:count])
+            peaks = []
+            for stream in (False, True):
+                tracemalloc.start()
+                ton.binary_meth_test(objects, objects, methods, os.path.join(tmp, 'bench.xlsx'), stream=stream)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+                tracemalloc.stop()
+            print(f'  {count:>4} methods   dataframes {peaks[0]:8.1f} MB   streaming {peaks[1]:8.1f} MB')
+
+# Objects for 'bench_testers': a fixed slice of 'def_objects' so the timings stay comparable between versions
+bench_objects = dict(list(ton.def_objects.items())[:24])
+
+# Time each of the six testers ('ton.testers') on 'bench_objects' with their default operations, writing into a temporary
+# directory, and print the best of 'repeat' runs in seconds and cells per second. With 'phases' the phase times of the
+# last run are printed as well (see 'ton.Profiler'). The default output is a Parquet table, as the Excel sheet of
+# 'unary_func_test' cannot hold the control characters returned by chr().
+def bench_testers(objects=bench_objects, repeat=3, output='parquet', phases=False):
+    print(f'testers on {len(objects)} objects, {output} output')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, tester in ton.testers.items():
+            binary = name.startswith('binary')
+            args = (objects, objects) if binary else (objects,)
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                matrix = tester(*args, OUTPUT_FILE=os.path.join(tmp, f'{name}.xlsx'), output=output)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            cells = matrix.types.size
+            print(f'  {name:<17} {cells:>7} cells {best:8.3f} s {cells / best:10.0f} cells/s')
+            if phases:
+                print(ton.profile_run(tester, *args, OUTPUT_FILE=os.path.join(tmp, f'{name}.xlsx'), output=output))
+
+
+if __name__ == '__main__':
+    bench_compile_cache()
+    bench_stream_memory()
+    bench_testers()
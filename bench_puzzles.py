@@ -0,0 +1,179 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from string import ascii_uppercase
+
+import Summation_puzzles as sp
+
+
+"""
+Benchmarks for 'Summation_puzzles'. Run the file directly to print the timings:
+
+    python bench_puzzles.py
+"""
+
+# The puzzles of the README, and the longest one the README mentions
+readme_puzzles = {
+    'base + ball': 'BASE+BALL=GAMES',
+    'Kyoto + Osaka': 'KYOTO+OSAKA=TOKYO',
+    'send + more': 'SEND+MORE=MONEY',
+    'so + many + ...': 'SO+MANY+MORE+MEN+SEEM+TO+SAY+THAT+THEY+MAY+SOON+TRY+TO+STAY+AT+HOME+SO+AS+TO+SEE+OR+HEAR+THE+'
+                       'SAME+ONE+MAN+TRY+TO+MEET+THE+TEAM+ON+THE+MOON+AS+HE+HAS+AT+THE+OTHER+TEN=TESTS',
+}
+
+# Known puzzles and all their answers, the letters replaced by their digits
+puzzle_corpus = {
+    'SEND+MORE=MONEY': ['9567+1085=10652'],
+    'BASE+BALL=GAMES': ['7483+7455=14938'],
+    'KYOTO+OSAKA=TOKYO': ['41373+32040=73413'],
+    'CROSS+ROADS=DANGER': ['96233+62513=158746'],
+    'DONALD+GERALD=ROBERT': ['526485+197485=723970'],
+    'GREEN+ORANGE=COLORS': ['83446+135684=219130'],
+    'EAT+THAT=APPLE': ['819+9219=10038'],
+    'COCA+COLA=OASIS': ['8186+8106=16292'],
+    'TO+GO=OUT': ['21+81=102'],
+    'FORTY+TEN+TEN=SIXTY': ['29786+850+850=31486'],
+    'SATURN+URANUS+NEPTUNE+PLUTO=PLANETS': ['127503+502351+3947539+46578=4623971'],
+    'THREE+THREE+TWO+TWO+ONE=ELEVEN': ['84611+84611+803+803+391=171219'],
+    'ODD+ODD=EVEN': ['655+655=1310', '855+855=1710'],
+    'NO+GUN+NO=HUNT': ['87+908+87=1082'],
+    'MONEY-SEND=MORE': ['10652-9567=1085'],
+    'LOGIC+LOGIC=PROLOG': ['90452+90452=180904'],
+    'USSR+USA=PEACE': ['9338+932=10270'],
+    'ABC+ABC=BCD': ['124+124=248', '125+125=250', '249+249=498', '374+374=748', '375+375=750'],
+    readme_puzzles['so + many + ...']: ['31+2764+2180+206+3002+91+374+9579+9504+274+3116+984+91+3974+79+5120+31+73+91+300+'
+                                        '18+5078+950+3720+160+276+984+91+2009+950+9072+16+950+2116+73+50+573+79+950+19508+'
+                                        '906=90393'],
+}
+
+# The puzzle with the digits of each solution in place of the letters
+def answers(text, solutions):
+    return [''.join(str(solution[ch]) if ch.isalpha() else ch for ch in text) for solution in solutions]
+
+# The puzzle with its letters replaced by other distinct letters at random
+def relabel(text, rng):
+    letters = sp.puzzle_letters(text)
+    names = dict(zip(letters, rng.sample(ascii_uppercase, len(letters))))
+    return ''.join(names.get(ch, ch) for ch in text)
+
+def best_time(function, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+# 'sum_puzzle' against the search over every digit assignment ('brute_force_puzzle', run once, as it takes minutes on
+# the 10 letters of the longest puzzle)
+def bench_solvers(puzzles=readme_puzzles, repeat=3, brute_force=True):
+    print('puzzle              solutions   sum_puzzle  brute force   speedup')
+    for name, text in puzzles.items():
+        elapsed, result = best_time(sp.sum_puzzle, text, repeat)
+        line = f'  {name:<18} {len(result):>6} {elapsed:11.4f} s'
+        if brute_force:
+            brute_elapsed, brute_result = best_time(sp.brute_force_puzzle, text, 1)
+            assert brute_result == result
+            line += f' {brute_elapsed:10.2f} s {brute_elapsed / elapsed:9.0f}x'
+        print(line)
+
+# The 'columns' and 'numpy' backends of 'sum_puzzle' on the same puzzles, best of 'repeat' runs, for growing batch sizes
+# of the numpy one
+def bench_backends(puzzles=readme_puzzles, repeat=3, batch_sizes=(10_000, 100_000, 1_000_000)):
+    print('puzzle              columns   ' + '  '.join(f'numpy {size:>9}' for size in batch_sizes))
+    for name, text in puzzles.items():
+        elapsed, result = best_time(sp.sum_puzzle, text, repeat)
+        line = f'  {name:<18} {elapsed:8.4f} s'
+        for size in batch_sizes:
+            vector_elapsed, solutions = best_time(lambda text: list(sp.solve_vectorized(text, size)), text, repeat)
+            assert solutions == result
+            line += f' {vector_elapsed:13.4f} s'
+        print(line)
+
+# 'sum_puzzle_parallel' in its three modes for growing numbers of worker processes, against the serial 'sum_puzzle'
+def bench_parallel(text=readme_puzzles['so + many + ...'], worker_counts=(1, 2, 4, 8), shard_letters=2):
+    serial, result = best_time(sp.sum_puzzle, text, 1)
+    print(f'{text[:24]}... serial {serial:8.3f} s')
+    for workers in worker_counts:
+        line = f'  {workers} workers'
+        for mode in ('all', 'count', 'first'):
+            start = time.perf_counter()
+            parallel = sp.sum_puzzle_parallel(text, mode, workers, shard_letters)
+            elapsed = time.perf_counter() - start
+            assert parallel == {'all': result, 'count': len(result), 'first': result[0] if result else None}[mode]
+            line += f'   {mode} {elapsed:8.3f} s'
+        print(line)
+
+# Time to the first solution and to the last, and peak traced memory, of 'brute_force_puzzle' (the original search, all
+# the digit assignments built up front by 'k_combs'), its generator form 'iter_brute_force' and 'iter_solutions'
+def bench_first_solution(puzzles=('KYOTO+OSAKA=TOKYO', 'BASE+BALL=GAMES', 'SEND+MORE=MONEY')):
+    searches = {'brute_force_puzzle': lambda text: iter(sp.brute_force_puzzle(text)),
+                'iter_brute_force': sp.iter_brute_force,
+                'iter_solutions': sp.iter_solutions}
+    for text in puzzles:
+        print(f'{text}: first solution, all solutions, peak memory')
+        for name, search in searches.items():
+            start = time.perf_counter()
+            solutions = search(text)
+            next(solutions, None)
+            first = time.perf_counter() - start
+            for _ in solutions:
+                pass
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            for _ in search(text):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'  {name:<19} {first * 1000:10.1f} ms {elapsed:8.3f} s {peak / 2 ** 20:10.2f} MB')
+
+# 'n' random relabelings of the corpus puzzles (but the longest one, timed in 'bench_solvers') solved one by one with
+# 'sum_puzzle' and as a batch with 'solve_batch', with an empty in-memory cache, with the same cache again and with a
+# cache file written by another PuzzleCache. Every result is checked against the answers of the corpus.
+def bench_batch(n=2_000, seed=0):
+    rng = random.Random(seed)
+    corpus = {text: expected for text, expected in puzzle_corpus.items() if text != readme_puzzles['so + many + ...']}
+    originals = [rng.choice(list(corpus)) for _ in range(n)]
+    batch = [relabel(text, rng) for text in originals]
+    print(f'{n} relabelings of {len(corpus)} corpus puzzles')
+
+    def check(results):
+        for original, text, result in zip(originals, batch, results):
+            assert answers(text, result) == corpus[original], text
+
+    start = time.perf_counter()
+    check([sp.sum_puzzle(text) for text in batch])
+    elapsed = time.perf_counter() - start
+    print(f'  sum_puzzle each          {elapsed:8.3f} s {n / elapsed:10.0f} puzzles/s')
+
+    cache = sp.PuzzleCache()
+    for name in ('solve_batch, new cache', 'solve_batch, warm cache'):
+        start = time.perf_counter()
+        check(sp.solve_batch(batch, cache))
+        elapsed = time.perf_counter() - start
+        print(f'  {name:<24} {elapsed:8.3f} s {n / elapsed:10.0f} puzzles/s   {cache.hits} hits {cache.misses} misses')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'puzzles.sqlite')
+        writer = sp.PuzzleCache(path)
+        sp.solve_batch(batch, writer)
+        writer.close()
+        reader = sp.PuzzleCache(path)
+        start = time.perf_counter()
+        check(sp.solve_batch(batch, reader))
+        elapsed = time.perf_counter() - start
+        print(f'  solve_batch, cache file  {elapsed:8.3f} s {n / elapsed:10.0f} puzzles/s   {reader.hits} hits '
+              f'{reader.misses} misses')
+        reader.close()
+
+
+if __name__ == '__main__':
+    bench_solvers()
+    bench_backends()
+    bench_parallel()
+    bench_first_solution()
+    bench_batch()
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+from Employee_class import EmployeeRecord
+
+
+'''
+Headcount, payroll (total salary) and gender split of the workforce as of
+any date, and as monthly series. An employee counts from the join date to
+the leave date inclusive.
+
+Every employee adds to the totals on the day they join and takes their
+share off on the day after they leave. These changes are summed in
+Fenwick (binary indexed) trees over the days since 'start' (the earliest
+join date unless given, moved back when an earlier one comes), so an
+as-of query is a prefix sum in O(log n). The monthly series buckets the same
+changes by month and adds them up in one pass. The trees follow changes
+of join_date, leave_date, salary and gender through
+EmployeeRecord.listeners until the analytics are closed.
+'''
+
+
+class FenwickTree:
+    '''Prefix sums of a list of numbers with O(log n) updates.'''
+
+    def __init__(self, values):
+        self._tree = [0] + list(values)
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        '''Sum of the values up to and including 'index'.'''
+        index = min(index + 1, len(self._tree) - 1)
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+
+class WorkforceAnalytics:
+    def __init__(self, records=(), start=None, days=None):
+        records = list(records)
+        self._fixed_start = start is not None    # a given start is kept, and earlier join dates are rejected
+        first = min((record.join_date for record in records), default=datetime.today())
+        self.start = (start or first).replace(hour=0, minute=0, second=0, microsecond=0)
+        self._records = {}    # {record identity: (record, first day, day after leaving or None, salary, is female)}
+        for record in records:
+            self._check_start(record)
+        entries = [self._entry(record) for record in records]
+        self._build(entries, days)
+        EmployeeRecord.listeners.append(self._changed)
+
+    def _check_start(self, record):
+        if self._fixed_start and record.join_date < self.start:
+            raise ValueError(f'join_date {record.join_date:%d.%m.%Y} is before the start of the analytics '
+                             f'{self.start:%d.%m.%Y}.')
+
+    def _day(self, dt):
+        return (dt - self.start).days
+
+    def _entry(self, record):
+        end = None if record.leave_date is None else self._day(record.leave_date) + 1
+        return record, self._day(record.join_date), end, record.salary, record.gender == 'F'
+
+    def _build(self, entries, days=None):
+        last = max((day for entry in entries for day in entry[1:3] if day is not None), default=0)
+        size = max(days or 0, last + 1, self._day(datetime.today()) + 366)
+        headcount, payroll, women = [0] * size, [0] * size, [0] * size
+        for entry in entries:
+            self._records[entry[0].identity()] = entry
+            for day, sign in ((entry[1], 1), (entry[2], -1)):
+                if day is not None:
+                    headcount[day] += sign
+                    payroll[day] += sign * entry[3]
+                    women[day] += sign * entry[4]
+        self._headcount = FenwickTree(headcount)
+        self._payroll = FenwickTree(payroll)
+        self._women = FenwickTree(women)
+
+    def _apply(self, entry, sign):
+        _, join, end, salary, female = entry
+        for day, change in ((join, sign), (end, -sign)):
+            if day is not None:
+                self._headcount.add(day, change)
+                self._payroll.add(day, change * salary)
+                if female:
+                    self._women.add(day, change)
+
+    def add(self, record):
+        if record.identity() in self._records:
+            return
+        self._check_start(record)
+        if record.join_date < self.start:    # rebuild the trees from the new start, the days of everyone move
+            self.start = record.join_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            records = [entry[0] for entry in self._records.values()] + [record]
+            self._build([self._entry(record) for record in records], len(self._headcount))
+            return
+        entry = self._entry(record)
+        self._records[record.identity()] = entry
+        last = max(entry[1], entry[2] or 0)
+        if last >= len(self._headcount):    # rebuild the trees with twice the days needed
+            self._build(list(self._records.values()), 2 * last)
+        else:
+            self._apply(entry, 1)
+
+    def remove(self, record):
+        self._apply(self._records.pop(record.identity()), -1)
+
+    def _changed(self, record, attribute, old, new):
+        if attribute in ('join_date', 'leave_date', 'salary', 'gender') and record.identity() in self._records:
+            self.remove(record)
+            self.add(record)
+
+    def close(self):
+        '''Stop following the changes of the employees.'''
+        if self._changed in EmployeeRecord.listeners:
+            EmployeeRecord.listeners.remove(self._changed)
+
+    def __len__(self):
+        return len(self._records)
+
+    def as_of(self, date):
+        '''Headcount, payroll and gender split on the date.'''
+        day = self._day(date)
+        if day < 0:
+            return {'headcount': 0, 'payroll': 0, 'M': 0, 'F': 0}
+        headcount = self._headcount.prefix(day)
+        women = self._women.prefix(day)
+        return {'headcount': headcount, 'payroll': self._payroll.prefix(day), 'M': headcount - women, 'F': women}
+
+    def headcount(self, date):
+        return self.as_of(date)['headcount']
+
+    def payroll(self, date):
+        return self.as_of(date)['payroll']
+
+    def gender_split(self, date):
+        split = self.as_of(date)
+        return {'M': split['M'], 'F': split['F']}
+
+    def monthly(self, first=None, last=None):
+        '''As-of figures on the first day of every month from the month of
+        'first' (the start by default) to that of 'last' (today by default),
+        as a list of (month, figures) pairs, in one pass over the employees.'''
+        first = (first or self.start).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        last = last or datetime.today()
+        months = (last.year - first.year) * 12 + last.month - first.month + 1
+        headcount, payroll, women = [0] * (months + 1), [0] * (months + 1), [0] * (months + 1)
+        for _, join, end, salary, female in self._records.values():
+            for day, sign in ((join, 1), (end, -1)):
+                if day is None:
+                    continue
+                date = self.start + timedelta(days=day)
+                month = (date.year - first.year) * 12 + date.month - first.month + (date.day > 1)
+                month = max(month, 0)    # changes before the first month count from it
+                if month <= months:
+                    headcount[month] += sign
+                    payroll[month] += sign * salary
+                    women[month] += sign * female
+
+        series = []
+        count = total = female_count = 0
+        for month in range(months):
+            count += headcount[month]
+            total += payroll[month]
+            female_count += women[month]
+            date = datetime(first.year + (first.month - 1 + month) // 12, (first.month - 1 + month) % 12 + 1, 1)
+            series.append((date, {'headcount': count, 'payroll': total, 'M': count - female_count, 'F': female_count}))
+        return series
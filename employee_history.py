@@ -0,0 +1,220 @@
+import glob
+import json
+import os
+import time
+import weakref
+from datetime import datetime
+
+from Employee_class import Employee, EmployeeRecord
+
+
+'''
+Append-only history of the changes to employees, to rebuild their state
+at any past time.
+
+Every change made through a setter (including the ones following from it,
+like the new email after a rename) is appended to a JSONL log as
+[time, employee, attribute, new value]. The first change of an employee
+the log has not seen comes after a [time, employee, null, {fields}] line
+with its state before the change, as does everything passed to track().
+
+The log is cut into segments. Every 'snapshot_interval' events the state
+of all employees is written to a snapshot and a new segment begins, so
+state_at(time) loads the last snapshot taken before the time and replays
+only the part of its segment up to the time. Compaction keeps the
+'keep_segments' newest segments and deletes the older ones (and their
+history) when a segment is closed, or at any time with compact().
+
+Employees are keyed 's<employee_id>' if an EmployeeStore gave them an
+id, and 'l<n>' numbered by the log otherwise, so the two never collide.
+'''
+
+fields = ('first_name', 'last_name', 'work_email', 'phone_number', 'trial_passed', 'join_date', 'leave_date', 'salary',
+          'gender')
+date_fields = ('join_date', 'leave_date')
+
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _state(record, **changed):
+    '''Fields of the record as JSON values, 'changed' ones replaced.'''
+    state = {field: _value(getattr(record, field)) for field in fields}
+    state.update((field, _value(value)) for field, value in changed.items())
+    return state
+
+def _timestamp(when):
+    return when.timestamp() if isinstance(when, datetime) else when
+
+
+class ChangeLog:
+    def __init__(self, directory, snapshot_interval=100_000, keep_segments=None):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.keep_segments = keep_segments    # None keeps the whole history
+        os.makedirs(directory, exist_ok=True)
+
+        self._ids = {}       # {record identity: employee key in the log}, while the record lives
+        self._next_id = 1    # next number of the 'l' keys
+        self._state = {}     # {employee key: fields} now
+        self._time = 0.0     # time of the last event, times never go back
+        self._events = 0     # events in the current segment
+        self._segments = self._find_segments()    # [(segment number, snapshot time)] oldest first
+        if self._segments:
+            self._resume()
+        else:
+            self._begin(0)
+        EmployeeRecord.listeners.append(self._changed)
+
+    # Files
+
+    def _path(self, segment, kind):
+        return os.path.join(self.directory, f'{segment:010}.{kind}')
+
+    def _find_segments(self):
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.snapshot'))):
+            with open(path) as file:    # the time comes first, no need to read the whole state
+                head = file.read(64)
+            when = float(head[len('{"time":'):head.index(',')])
+            segments.append((int(os.path.basename(path).split('.')[0]), when))
+        return segments
+
+    def _load_snapshot(self, segment):
+        with open(self._path(segment, 'snapshot')) as file:
+            snapshot = json.load(file)
+        return snapshot, snapshot['state']
+
+    def _replay(self, segment, state, until=None):
+        '''Apply the events of the segment up to the time 'until' to the
+        state, return the number of events applied and the last time.'''
+        events, last = 0, None
+        with open(self._path(segment, 'log')) as file:
+            for line in file:
+                try:
+                    when, key, attribute, value = json.loads(line)
+                except ValueError:    # a line cut short by a crash
+                    break
+                if until is not None and when > until:
+                    break
+                if attribute is None:
+                    state[key] = value
+                else:
+                    state[key][attribute] = value
+                events += 1
+                last = when
+        return events, last
+
+    def _resume(self):
+        segment = self._segments[-1][0]
+        snapshot, self._state = self._load_snapshot(segment)
+        self._time = snapshot['time']
+        self._next_id = snapshot['next_id']
+        self._events, last = self._replay(segment, self._state)
+        self._time = max(self._time, last or 0.0)
+        self._next_id = max(self._next_id, max((int(key[1:]) for key in self._state if key[0] == 'l'), default=0) + 1)
+        self._log = open(self._path(segment, 'log'), 'a')
+
+    def _begin(self, segment):
+        '''Write the snapshot of the state now and start its segment.'''
+        snapshot = {'time': self._time, 'next_id': self._next_id, 'state': self._state}
+        with open(self._path(segment, 'snapshot.tmp'), 'w') as file:
+            file.write(_encode(snapshot))
+        os.replace(self._path(segment, 'snapshot.tmp'), self._path(segment, 'snapshot'))
+        self._log = open(self._path(segment, 'log'), 'a')
+        self._segments.append((segment, self._time))
+        self._events = 0
+
+    def snapshot(self):
+        '''Close the current segment and start a new one from a snapshot.'''
+        self._log.close()
+        self._begin(self._segments[-1][0] + 1)
+        if self.keep_segments is not None:
+            self.compact(self.keep_segments)
+
+    def compact(self, keep_segments=1):
+        '''Delete all but the 'keep_segments' newest segments. State can no
+        longer be rebuilt before the first snapshot kept.'''
+        while len(self._segments) > max(keep_segments, 1):
+            segment, _ = self._segments.pop(0)
+            os.remove(self._path(segment, 'log'))
+            os.remove(self._path(segment, 'snapshot'))
+
+    def flush(self):
+        self._log.flush()
+
+    def close(self):
+        if self._changed in EmployeeRecord.listeners:
+            EmployeeRecord.listeners.remove(self._changed)
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Writing
+
+    def _write(self, key, attribute, value):
+        self._time = max(self._time, time.time())
+        self._log.write(_encode([self._time, key, attribute, value]) + '\n')
+        if attribute is None:
+            self._state[key] = value
+        else:
+            self._state[key][attribute] = value
+        self._events += 1
+        if self._events >= self.snapshot_interval:
+            self.snapshot()
+
+    def number(self, record):
+        '''Key of the record in the log, None if not tracked.'''
+        return self._ids.get(record.identity())
+
+    def track(self, record, **changed):
+        '''Log the state of the record (with the 'changed' fields replaced)
+        and follow its changes. Return its key in the log.'''
+        key = self._ids.get(record.identity())
+        if key is None:
+            employee_id = getattr(record, 'employee_id', None)
+            if employee_id is None:
+                key = f'l{self._next_id}'
+                self._next_id += 1
+            else:
+                key = f's{employee_id}'
+            self._ids[record.identity()] = key
+            # A new record may reuse the identity of a collected one, it must not get its key
+            weakref.finalize(record.identity_owner(), self._ids.pop, record.identity(), None)
+            self._write(key, None, _state(record, **changed))
+        return key
+
+    def _changed(self, record, attribute, old, new):
+        if record.identity() not in self._ids:
+            self.track(record, **{attribute: old})
+        self._write(self._ids[record.identity()], attribute, _value(new))
+
+    # Reading
+
+    def state_at(self, when):
+        '''Fields of every employee as they were at the time (a datetime or
+        a time.time() value), {employee key: {field: JSON value}}.'''
+        when = _timestamp(when)
+        self.flush()
+        segments = [segment for segment, start in self._segments if start <= when]
+        if not segments:
+            raise ValueError(f'The history before {datetime.fromtimestamp(self._segments[0][1])} was compacted.')
+        _, state = self._load_snapshot(segments[-1])
+        self._replay(segments[-1], state, when)
+        return state
+
+    def employees_at(self, when):
+        '''Employee objects as they were at the time, {employee key: Employee}.'''
+        employees = {}
+        for key, state in self.state_at(when).items():
+            state = dict(state)
+            for field in date_fields:
+                state[field] = None if state[field] is None else datetime.fromisoformat(state[field])
+            employees[key] = Employee.restore(**state)
+        return employees
@@ -0,0 +1,229 @@
+import csv
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+from Employee_class import EmployeeRecord, EmployeeTable
+
+
+'''
+Bulk import of employee records from CSV (with a header row) or JSONL
+files into an EmployeeTable. The columns are those of Employee:
+first_name, last_name, join_date, salary, gender, leave_date,
+phone_number, trial_passed. Missing or empty leave_date / phone_number /
+trial_passed are None / None / False.
+
+Records are read in chunks and validated a column at a time with the
+rules of Employee. A row with any invalid value is rejected as a whole
+and listed in the ImportReport with the line it came from and the first
+error, the others go into the table. Dates are parsed with the format
+found for the column in the file, falling back to the other formats of
+Employee.date_formats, and each distinct date string is parsed once.
+Emails are allocated like for an Employee: first.last@company.com, or
+first.last2@company.com and so on when that is taken, and none for who
+has already left.
+'''
+
+fields = ('first_name', 'last_name', 'join_date', 'salary', 'gender', 'leave_date', 'phone_number', 'trial_passed')
+
+trial_values = {'': False, 'False': False, 'false': False, '0': False, 'True': True, 'true': True, '1': True}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = []         # [(line, error message)]
+        self.emails_taken = []     # lines of accepted rows given a numbered email as first.last was taken
+
+    def __repr__(self):
+        return (f'<ImportReport {self.rows} rows, {self.accepted} accepted, {len(self.rejected)} rejected, '
+                f'{len(self.emails_taken)} numbered emails>')
+
+
+class DateColumn:
+    '''Parser for one date column of a file: remembers the format that
+    worked last and the result for every string seen.'''
+
+    def __init__(self, message):
+        self.message = message
+        self.format = None
+        self._parsed = {}
+
+    def __call__(self, value):
+        try:
+            dt = self._parsed[value]
+        except KeyError:
+            dt = self._parsed[value] = self._parse(value)
+        except TypeError:    # unhashable, e.g. a list from JSON
+            dt = self._parse(value)
+        if dt is None:
+            raise ValueError(self.message)
+        return dt
+
+    def _parse(self, value):
+        if self.format is not None:
+            try:
+                return datetime.strptime(value, self.format)
+            except (ValueError, TypeError):
+                pass
+        for format in EmployeeRecord.date_formats:
+            try:
+                dt = datetime.strptime(value, format)
+            except (ValueError, TypeError):
+                continue
+            self.format = format
+            return dt
+        return None
+
+
+def _number(value):
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+def _optional(value):
+    return None if value == '' else value
+
+def _trial(value):
+    if value is None:
+        return False
+    return trial_values.get(value, value) if isinstance(value, str) else value
+
+def _json_records(file, report):
+    '''(line, record) pairs of a JSONL file. A line that is not a JSON
+    object is counted and rejected in the report (if any) and skipped.'''
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as error:
+            message = f'Not valid JSON: {error}'
+        else:
+            if isinstance(record, dict):
+                yield line, record
+                continue
+            message = f'Expected a JSON object, got {type(record).__name__}.'
+        if report is not None:
+            report.rows += 1
+            report.rejected.append((line, message))
+
+
+def read_columns(path, chunk_size=65536, report=None):
+    '''Records of a CSV or JSONL file (by its extension) in chunks of
+    'chunk_size' records, each chunk a pair of the lines the records came
+    from and a dictionary of the columns ({field: list of values}). JSONL
+    lines that are not objects go to 'report' and the rest are read on.'''
+    with open(path, newline='') as file:
+        if os.path.splitext(path)[1].lower() in ('.jsonl', '.json', '.ndjson'):
+            records = _json_records(file, report)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                yield [line for line, _ in chunk], {field: [record.get(field) for _, record in chunk]
+                                                    for field in fields}
+        else:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            positions = {field: header.index(field) for field in fields if field in header}
+            while True:
+                lines = []
+                rows = []
+                read = 0
+                for row in islice(reader, chunk_size):
+                    read += 1
+                    if row:
+                        row.extend([None] * (len(header) - len(row)))    # missing trailing fields
+                        rows.append(row)
+                        lines.append(reader.line_num)
+                if not read:
+                    break
+                if not rows:
+                    continue
+                values = list(zip(*rows))
+                yield lines, {field: list(values[positions[field]]) if field in positions else [None] * len(rows)
+                              for field in fields}
+
+
+def _validate_column(values, check, errors):
+    '''Apply 'check' to the column, None and the first error of each row
+    into 'errors' ({row: message}) for the invalid values.'''
+    checked = []
+    for row, value in enumerate(values):
+        try:
+            checked.append(check(value))
+        except (ValueError, TypeError) as error:
+            checked.append(None)
+            errors.setdefault(row, str(error))
+    return checked
+
+
+def import_chunk(lines, columns, table, report, join_dates, leave_dates, now):
+    errors = {}
+
+    first_names = _validate_column(columns['first_name'], lambda v: EmployeeRecord.valid_name(v, 'first_name'),
+                                   errors)
+    last_names = _validate_column(columns['last_name'], lambda v: EmployeeRecord.valid_name(v, 'last_name'),
+                                  errors)
+    phones = _validate_column(map(_optional, columns['phone_number']), EmployeeRecord.valid_phone_number, errors)
+    trials = _validate_column(map(_trial, columns['trial_passed']), EmployeeRecord.valid_trial_passed, errors)
+    joins = _validate_column(columns['join_date'], lambda v: EmployeeRecord.check_join_date(join_dates(v), now),
+                             errors)
+
+    def leave(row):
+        value = columns['leave_date'][row]
+        if value in (None, '') or joins[row] is None:
+            return None
+        return EmployeeRecord.check_leave_date(leave_dates(value), joins[row])
+
+    leaves = _validate_column(range(len(lines)), leave, errors)
+    salaries = _validate_column(map(_number, columns['salary']), EmployeeRecord.valid_salary, errors)
+    genders = _validate_column(columns['gender'], EmployeeRecord.valid_gender, errors)
+
+    accepted = [row for row in range(len(lines)) if row not in errors]
+    emails = []
+    for row in accepted:
+        if leaves[row] is not None:    # who has left holds no email
+            emails.append(None)
+            continue
+        try:
+            email = EmployeeRecord.new_email(first_names[row], last_names[row])
+        except ValueError as error:
+            errors[row] = str(error)
+            continue
+        if not email.startswith(f'{first_names[row].lower()}.{last_names[row].lower()}@'):
+            report.emails_taken.append(lines[row])
+        emails.append(email)
+    accepted = [row for row in accepted if row not in errors]
+
+    table.extend([first_names[row] for row in accepted], [last_names[row] for row in accepted], emails,
+                 [phones[row] for row in accepted], [EmployeeTable.to_day(joins[row]) for row in accepted],
+                 [EmployeeTable.to_day(leaves[row]) for row in accepted], [salaries[row] for row in accepted],
+                 [genders[row] for row in accepted], [trials[row] for row in accepted])
+    report.rows += len(lines)
+    report.accepted += len(accepted)
+    report.rejected.extend((lines[row], errors[row]) for row in sorted(errors))
+
+
+def import_employees(path, table=None, chunk_size=65536):
+    '''Import the employees of a CSV / JSONL file into 'table' (a new
+    EmployeeTable by default). Return the table and the ImportReport.'''
+    if table is None:
+        table = EmployeeTable()
+    report = ImportReport()
+    join_dates = DateColumn('Date should be a string in "dd.mm.yyyy" format.')
+    leave_dates = DateColumn('Not a valid date.')
+    now = datetime.now()
+    for lines, columns in read_columns(path, chunk_size, report):
+        import_chunk(lines, columns, table, report, join_dates, leave_dates, now)
+    report.rejected.sort()    # unreadable lines are reported as they are read, before their chunk
+    return table, report
@@ -0,0 +1,359 @@
+import queue
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from heapq import heapify
+
+from Employee_class import EmailAllocator, Employee, EmployeeRecord
+
+
+'''
+Persistence of Employee records, their teams and work emails in a SQLite
+database in WAL mode, so that readers in other threads and processes are
+not blocked by the writer.
+
+Opening a store reads nothing but the largest employee id. Employees are
+read when they are asked for (get, find, active_on, teams_of, iteration)
+and kept while they are in use, so the same id always gives the same
+Employee object. The store installs its own EmailAllocator as
+EmployeeRecord.emails, which reads the taken addresses of a base name
+(first.last) from the database the first time the base is used.
+
+Writes are batched: add, add_team and every change of a stored employee
+(followed through EmployeeRecord.listeners) are kept in memory and written
+in one transaction when 'batch_size' of them are waiting, on flush() and
+on close(). Reads go through a small pool of read-only connections and
+see what has been flushed.
+'''
+
+schema = '''
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    work_email TEXT UNIQUE,
+    email_base TEXT,
+    phone_number TEXT,
+    trial_passed INTEGER NOT NULL,
+    join_date TEXT NOT NULL,
+    leave_date TEXT,
+    salary NUMERIC NOT NULL,
+    gender TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS employees_name ON employees (last_name, first_name);
+CREATE INDEX IF NOT EXISTS employees_email_base ON employees (email_base);
+CREATE INDEX IF NOT EXISTS employees_join_date ON employees (join_date);
+CREATE INDEX IF NOT EXISTS employees_leave_date ON employees (leave_date);
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS team_members (
+    team_id INTEGER NOT NULL REFERENCES teams (id),
+    employee_id INTEGER NOT NULL REFERENCES employees (id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (team_id, employee_id)
+);
+CREATE INDEX IF NOT EXISTS team_members_employee ON team_members (employee_id);
+'''
+
+columns = ('first_name', 'last_name', 'work_email', 'email_base', 'phone_number', 'trial_passed', 'join_date',
+           'leave_date', 'salary', 'gender')
+
+
+def _date(dt):
+    return None if dt is None else dt.isoformat()
+
+def _row(employee):
+    '''Values of the employee in the order of 'columns'.'''
+    email = employee.work_email
+    base = None if email is None else EmailAllocator._split(email)[0]
+    return (employee.first_name, employee.last_name, email, base, employee.phone_number, int(employee.trial_passed),
+            _date(employee.join_date), _date(employee.leave_date), employee.salary, employee.gender)
+
+def _employee(row):
+    '''Employee from a row of (id, *columns).'''
+    (employee_id, first_name, last_name, work_email, _, phone_number, trial_passed, join_date, leave_date, salary,
+     gender) = row
+    employee = Employee.restore(first_name, last_name, datetime.fromisoformat(join_date), salary, gender,
+                                None if leave_date is None else datetime.fromisoformat(leave_date), phone_number,
+                                bool(trial_passed), work_email)
+    employee.employee_id = employee_id
+    return employee
+
+def _team_key(ids):
+    return ','.join(map(str, sorted(ids)))
+
+
+class StoredEmailAllocator(EmailAllocator):
+    '''EmailAllocator that reads the addresses of a base name from the
+    store on the first use of the base. Numbers below the largest one in
+    use that nobody holds are free, as if they had been released.'''
+
+    def __init__(self, store, previous=None):
+        super().__init__(previous.domain if previous is not None else 'company.com')
+        self.store = store
+        self._loaded = set()
+        if previous is not None:    # addresses given out before the store was opened
+            for email in previous:
+                self._taken.add(email)
+                base, number = self._split(email)
+                self._next[base] = max(self._next.get(base, 1), number + 1)
+
+    def _load(self, base):
+        if self.store is None or base in self._loaded:
+            return
+        self._loaded.add(base)
+        numbers = [self._split(email)[1] for email in self.store.emails_of(base)]
+        if not numbers:
+            return
+        self._taken.update(self._address(base, number) for number in numbers)
+        self._next[base] = max(self._next.get(base, 1), max(numbers) + 1)
+        free = [number for number in range(1, self._next[base]) if self._address(base, number) not in self._taken]
+        heapify(free)
+        self._free[base] = free
+
+    def clear(self):
+        '''Forget the addresses read so far, they are read again when used.'''
+        super().clear()
+        self._loaded.clear()
+
+
+class EmployeeStore:
+    def __init__(self, path='employees.sqlite', pool_size=4, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.execute('PRAGMA journal_mode=WAL')
+        self._writer.execute('PRAGMA synchronous=NORMAL')
+        self._writer.execute('PRAGMA foreign_keys=ON')
+        self._writer.executescript(schema)
+        self._next_id = self._writer.execute('SELECT coalesce(max(id), 0) + 1 FROM employees').fetchone()[0]
+
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            reader = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+            self._pool.put(reader)
+
+        self._loaded = weakref.WeakValueDictionary()    # {employee id: Employee} of the employees in use
+        self._inserts = {}    # {employee id: Employee} not written yet
+        self._updates = {}    # {employee id: Employee} changed since the last write
+        self._teams = {}      # {team key: member ids} not written yet
+
+        self.emails = StoredEmailAllocator(self, EmployeeRecord.emails)
+        EmployeeRecord.emails = self.emails
+        EmployeeRecord.listeners.append(self._changed)
+
+    @contextmanager
+    def _reader(self):
+        reader = self._pool.get()
+        try:
+            yield reader
+        finally:
+            self._pool.put(reader)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''Write what is waiting, stop following the employees and close the
+        database. The email allocator stays installed with the addresses it
+        has read.'''
+        with self._lock:
+            self.flush()
+            if self._changed in EmployeeRecord.listeners:
+                EmployeeRecord.listeners.remove(self._changed)
+            self.emails.store = None
+            self._writer.close()
+            while not self._pool.empty():
+                self._pool.get().close()
+
+    # Writing
+
+    def _pending(self):
+        return len(self._inserts) + len(self._updates) + len(self._teams)
+
+    def add(self, employee):
+        '''Store the employee, give it an employee_id and return the id.'''
+        if not isinstance(employee, Employee):
+            raise TypeError('Only Employee objects can be stored.')
+        with self._lock:
+            if employee.employee_id is not None and self._loaded.get(employee.employee_id) is employee:
+                return employee.employee_id
+            employee.employee_id = self._next_id
+            self._next_id += 1
+            self._loaded[employee.employee_id] = employee
+            self._inserts[employee.employee_id] = employee
+            if self._pending() >= self.batch_size:
+                self.flush()
+            return employee.employee_id
+
+    def add_many(self, employees):
+        return [self.add(employee) for employee in employees]
+
+    def add_team(self, members):
+        '''Store the team, and the members that are not stored yet. A team
+        of the same members is stored once.'''
+        with self._lock:
+            ids = [self.add(member) for member in members]
+            self._teams.setdefault(_team_key(ids), ids)
+            if self._pending() >= self.batch_size:
+                self.flush()
+
+    def save_teams(self, registry=None):
+        '''Store every team of the registry (EmployeeRecord.teams by default).'''
+        for team in (registry if registry is not None else EmployeeRecord.teams):
+            self.add_team(team)
+
+    def _changed(self, record, attribute, old, new):
+        employee_id = getattr(record, 'employee_id', None)
+        if employee_id is None:
+            return
+        with self._lock:
+            if self._loaded.get(employee_id) is not record or employee_id in self._inserts:
+                return
+            self._updates[employee_id] = record
+            if self._pending() >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        '''Write the waiting inserts, updates and teams in one transaction.'''
+        with self._lock:
+            if not self._pending():
+                return
+            with self._writer:
+                # Emails move between employees in any order, so the changed ones are cleared first to keep them unique
+                self._writer.executemany('UPDATE employees SET work_email = NULL WHERE id = ?',
+                                         ((employee_id,) for employee_id in self._updates))
+                self._writer.executemany(
+                    f'INSERT INTO employees (id, {", ".join(columns)}) VALUES (?, {", ".join("?" * len(columns))})',
+                    ((employee_id, *_row(employee)) for employee_id, employee in self._inserts.items()))
+                self._writer.executemany(
+                    f'UPDATE employees SET {", ".join(column + " = ?" for column in columns)} WHERE id = ?',
+                    ((*_row(employee), employee_id) for employee_id, employee in self._updates.items()))
+                self._writer.executemany('INSERT OR IGNORE INTO teams (key) VALUES (?)',
+                                         ((key,) for key in self._teams))
+                self._writer.executemany(
+                    'INSERT OR IGNORE INTO team_members (team_id, employee_id, position) '
+                    'SELECT id, ?, ? FROM teams WHERE key = ?',
+                    ((employee_id, position, key) for key, ids in self._teams.items()
+                     for position, employee_id in enumerate(ids)))
+            self._inserts.clear()
+            self._updates.clear()
+            self._teams.clear()
+
+    # Reading
+
+    def _select(self, where, parameters=(), limit=-1):
+        '''Employees of the rows matching the condition in the order of their
+        ids, the ones in use as they are.'''
+        with self._reader() as reader:
+            rows = reader.execute(f'SELECT id, {", ".join(columns)} FROM employees WHERE {where} ORDER BY id LIMIT ?',
+                                  (*parameters, limit)).fetchall()
+        employees = []
+        with self._lock:
+            for row in rows:
+                employee = self._loaded.get(row[0])
+                if employee is None:
+                    employee = self._loaded[row[0]] = _employee(row)
+                employees.append(employee)
+        return employees
+
+    def get(self, employee_id):
+        '''The employee with the id, read from the database if not in use.'''
+        employee = self._loaded.get(employee_id)
+        if employee is not None:
+            return employee
+        employees = self._select('id = ?', (employee_id,))
+        if not employees:
+            raise KeyError(employee_id)
+        return employees[0]
+
+    def get_many(self, ids, chunk_size=500):
+        ids = list(ids)
+        found = {}
+        missing = [employee_id for employee_id in ids if self._loaded.get(employee_id) is None]
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            for employee in self._select(f'id IN ({", ".join("?" * len(chunk))})', chunk):
+                found[employee.employee_id] = employee
+        return [found.get(employee_id) or self.get(employee_id) for employee_id in ids]
+
+    def find(self, first_name=None, last_name=None, work_email=None, joined=(None, None), left=(None, None)):
+        '''Employees with the given name and / or email, who joined and / or
+        left between the dates of the (from, to) pairs, ends included and
+        None meaning open.'''
+        conditions = []
+        parameters = []
+        for column, value in (('first_name', first_name), ('last_name', last_name), ('work_email', work_email)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                parameters.append(value)
+        for column, (start, end) in (('join_date', joined), ('leave_date', left)):
+            if start is not None:
+                conditions.append(f'{column} >= ?')
+                parameters.append(_date(start))
+            if end is not None:
+                conditions.append(f'{column} <= ?')
+                parameters.append(_date(end))
+        self.flush()
+        return self._select(' AND '.join(conditions) or '1', parameters)
+
+    def active_on(self, date):
+        '''Employees working on the date.'''
+        self.flush()
+        return self._select('join_date <= ? AND (leave_date IS NULL OR leave_date >= ?)', (_date(date), _date(date)))
+
+    def emails_of(self, base):
+        '''Stored addresses of the base name (first.last).'''
+        with self._reader() as reader:
+            return [email for email, in reader.execute('SELECT work_email FROM employees WHERE email_base = ?',
+                                                       (base,))]
+
+    def teams_of(self, employee):
+        '''Stored teams of the employee, as tuples of Employees.'''
+        self.flush()
+        with self._reader() as reader:
+            rows = reader.execute('SELECT others.team_id, others.employee_id FROM team_members AS own '
+                                  'JOIN team_members AS others ON others.team_id = own.team_id '
+                                  'WHERE own.employee_id = ? ORDER BY others.team_id, others.position',
+                                  (employee.employee_id,)).fetchall()
+        teams = {}
+        for team_id, employee_id in rows:
+            teams.setdefault(team_id, []).append(employee_id)
+        return [tuple(self.get_many(ids)) for ids in teams.values()]
+
+    def load_teams(self, registry=None):
+        '''Register every stored team in the registry (EmployeeRecord.teams
+        by default), reading their members.'''
+        self.flush()
+        registry = registry if registry is not None else EmployeeRecord.teams
+        with self._reader() as reader:
+            rows = reader.execute('SELECT team_id, employee_id FROM team_members ORDER BY team_id, position').fetchall()
+        teams = {}
+        for team_id, employee_id in rows:
+            teams.setdefault(team_id, []).append(employee_id)
+        for ids in teams.values():
+            registry.add(tuple(self.get_many(ids)))
+
+    def __len__(self):
+        self.flush()
+        with self._reader() as reader:
+            return reader.execute('SELECT count(*) FROM employees').fetchone()[0]
+
+    def __iter__(self, page=1000):
+        '''All employees in the order of their ids, read a page at a time.'''
+        self.flush()
+        last = 0
+        while True:
+            employees = self._select('id > ?', (last,), page)
+            if not employees:
+                return
+            yield from employees
+            last = employees[-1].employee_id
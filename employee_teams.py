@@ -0,0 +1,136 @@
+import heapq
+from bisect import insort
+from datetime import datetime
+from itertools import accumulate
+
+
+'''
+Search for teams of k employees among a pool, under a minimum total
+tenure (in days), a salary budget and / or gender balance (as many women
+as men, give or take one), following the rules of Employee.__add__:
+only employees still working, nobody twice.
+
+The pool is kept as columns sorted by salary. Teams are built by adding
+members in that order, and a partial team is dropped, with every team
+that would come after it, as soon as one of the bounds shows it cannot
+be completed:
+
+- salary: the cheapest completion takes the next members in salary
+  order, a difference of prefix sums;
+- tenure: the longest completion takes the members of longest tenure
+  among the rest, summed ahead of the search for every position;
+- balance: the rest must still hold enough women and men.
+
+teams() streams every team meeting the constraints, top() keeps the
+best n by total tenure, by lowest total salary or by a score function,
+and raises the bound as the best teams get better.
+'''
+
+
+class TeamSearch:
+    def __init__(self, employees, reference=None):
+        self.reference = reference or datetime.today()
+        pool = {}
+        for employee in employees:
+            try:
+                employee.check_team()    # still working
+            except ValueError:
+                continue
+            pool.setdefault(employee.identity(), employee)
+        self.employees = sorted(pool.values(), key=lambda employee: employee.salary)
+        self.salaries = [employee.salary for employee in self.employees]
+        self.tenures = [(self.reference - employee.join_date).days for employee in self.employees]
+        self.women = [employee.gender == 'F' for employee in self.employees]
+        self._salary_sums = list(accumulate(self.salaries, initial=0))
+        self._women_after = list(accumulate(reversed(self.women), initial=0))[::-1]    # women from each position on
+        self._tenure_bounds = {}
+
+    def __len__(self):
+        return len(self.employees)
+
+    def _longest(self, k):
+        '''For every position, the totals of the 1, 2, ..., k longest
+        tenures from that position on.'''
+        if k not in self._tenure_bounds:
+            bounds = [None] * (len(self.tenures) + 1)
+            longest = []    # the k longest tenures so far, ascending
+            bounds[-1] = [0] * (k + 1)
+            for position in range(len(self.tenures) - 1, -1, -1):
+                insort(longest, self.tenures[position])
+                del longest[:-k]
+                bounds[position] = [0, *accumulate(reversed(longest))] + [0] * (k - len(longest))
+            self._tenure_bounds[k] = bounds
+        return self._tenure_bounds[k]
+
+    def _search(self, k, limits, balanced):
+        '''Teams as lists of positions in the pool, in salary order. The
+        bounds are read from 'limits' every time, so they can be raised
+        during the search.'''
+        n = len(self.employees)
+        longest = self._longest(k)
+        salary_sums = self._salary_sums
+        women_after = self._women_after
+        team = []
+
+        def extend(start, salary, tenure, women):
+            left = k - len(team)
+            if not left:    # the bounds only looked ahead, the last member may still break them
+                min_tenure = limits.get('min_tenure')
+                if (min_tenure is None or tenure >= min_tenure) and (not balanced or abs(2 * women - k) <= 1):
+                    yield team
+                return
+            for position in range(start, n - left + 1):
+                # Each bound only gets worse further on, so a failed one ends the loop
+                max_salary = limits.get('max_salary')
+                if max_salary is not None and salary + salary_sums[position + left] - salary_sums[position] > max_salary:
+                    break
+                min_tenure = limits.get('min_tenure')
+                if min_tenure is not None and tenure + longest[position][left] < min_tenure:
+                    break
+                if balanced:
+                    available = women_after[position]
+                    lowest = max(k // 2 - women, left - (n - position - available), 0)
+                    highest = min((k + 1) // 2 - women, available, left)
+                    if lowest > highest:
+                        break
+                team.append(position)
+                yield from extend(position + 1, salary + self.salaries[position], tenure + self.tenures[position],
+                                  women + self.women[position])
+                team.pop()
+
+        return extend(0, 0, 0, 0)
+
+    def teams(self, k, min_tenure=None, max_salary=None, balanced=False):
+        '''Generate the teams of k employees (tuples, in salary order) with
+        at least 'min_tenure' days worked in total, a total salary of at
+        most 'max_salary' and, if 'balanced', gender balance.'''
+        for team in self._search(k, {'min_tenure': min_tenure, 'max_salary': max_salary}, balanced):
+            yield tuple(self.employees[position] for position in team)
+
+    def top(self, n, k, score='tenure', min_tenure=None, max_salary=None, balanced=False):
+        '''The n best teams by 'score', best first: 'tenure' (longest total
+        tenure), 'salary' (lowest total salary) or a function of the team.
+        Return a list of (score, team) pairs.'''
+        limits = {'min_tenure': min_tenure, 'max_salary': max_salary}
+        best = []    # heap of (score, order found, positions), the worst of the n best first
+        for found, team in enumerate(self._search(k, limits, balanced)):
+            if score == 'tenure':
+                value = sum(self.tenures[position] for position in team)
+            elif score == 'salary':
+                value = -sum(self.salaries[position] for position in team)
+            else:
+                value = score(tuple(self.employees[position] for position in team))
+            entry = (value, -found, list(team))
+            if len(best) < n:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+            else:
+                continue
+            if len(best) == n:    # nothing worse than the n-th best can get in any more
+                if score == 'tenure':
+                    limits['min_tenure'] = max(min_tenure or 0, best[0][0])
+                elif score == 'salary':
+                    limits['max_salary'] = -best[0][0] if max_salary is None else min(max_salary, -best[0][0])
+        return [(-value if score == 'salary' else value, tuple(self.employees[position] for position in team))
+                for value, _, team in sorted(best, reverse=True)]
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from Employee_class import Employee
+from employee_analytics import WorkforceAnalytics
+
+
+# Employees as read back from a store (Employee.restore), which may hold join dates from before 2000
+def make_employees():
+    return [Employee.restore('Ann', 'Lee', datetime(1995, 3, 15), 20000, 'F', leave_date=datetime(2004, 12, 31)),
+            Employee.restore('Bob', 'Kim', datetime(1998, 6, 1), 30000, 'M'),
+            Employee('Cy', 'Ray', '01.01.2010', 40000, 'M')]
+
+def scan(employees, date):
+    working = [employee for employee in employees
+               if employee.join_date <= date and (employee.leave_date is None or date <= employee.leave_date)]
+    women = sum(employee.gender == 'F' for employee in working)
+    return {'headcount': len(working), 'payroll': sum(employee.salary for employee in working),
+            'M': len(working) - women, 'F': women}
+
+dates = [datetime(1994, 1, 1), datetime(1995, 3, 15), datetime(1999, 1, 1), datetime(2004, 12, 31),
+         datetime(2005, 1, 1), datetime(2012, 1, 1)]
+
+
+# Join dates before 2000, the old default start, are counted from their day
+def test_join_dates_before_start():
+    employees = make_employees()
+    analytics = WorkforceAnalytics(employees)
+    try:
+        for date in dates:
+            assert analytics.as_of(date) == scan(employees, date)
+        assert dict(analytics.monthly(datetime(1999, 1, 1), datetime(1999, 1, 1)))[datetime(1999, 1, 1)] == \
+            scan(employees, datetime(1999, 1, 1))
+    finally:
+        analytics.close()
+
+def test_earlier_join_date_moves_start():
+    employees = make_employees()
+    analytics = WorkforceAnalytics(employees[2:])
+    try:
+        analytics.add(employees[1])
+        analytics.add(employees[0])
+        employees[2].join_date = '01.01.2003'
+        analytics.remove(employees[0])
+        analytics.add(employees[0])
+        for date in dates:
+            assert analytics.as_of(date) == scan(employees, date)
+    finally:
+        analytics.close()
+
+def test_start_after_join_date_rejected():
+    with pytest.raises(ValueError):
+        WorkforceAnalytics(make_employees(), start=datetime(2000, 1, 1))
+    analytics = WorkforceAnalytics(make_employees()[2:], start=datetime(2005, 1, 1))
+    try:
+        with pytest.raises(ValueError):
+            analytics.add(make_employees()[0])
+    finally:
+        analytics.close()
@@ -0,0 +1,33 @@
+from Employee_class import Employee, EmployeeRecord, EmployeeTable
+
+
+def record_changes(changes):
+    def listener(record, attribute, old, new):
+        changes.append((attribute, old, new))
+    return listener
+
+# A rename through full_name moves the email once, without an address for the intermediate name
+def test_full_name_moves_email_once():
+    for make in (lambda: Employee('Ann', 'Lee', '01.01.2020', 20000, 'F'),
+                 lambda: EmployeeTable().append('Ann', 'Lee', '01.01.2020', 20000, 'F')):
+        ann = make()
+        email = ann.work_email
+        changes = []
+        EmployeeRecord.listeners.append(record_changes(changes))
+        try:
+            ann.full_name = 'Bo Kim'
+        finally:
+            EmployeeRecord.listeners.pop()
+        assert changes == [('first_name', 'Ann', 'Bo'), ('last_name', 'Lee', 'Kim'),
+                           ('work_email', email, ann.work_email)]
+        assert ann.work_email.startswith('bo.kim')
+        assert 'bo.lee@company.com' not in EmployeeRecord.emails
+        assert email not in EmployeeRecord.emails
+        EmployeeRecord.emails.release(ann.work_email)
+
+def test_full_name_keeps_email_of_same_name():
+    ann = Employee('Ann', 'Lee', '01.01.2020', 20000, 'F')
+    email = ann.work_email
+    ann.full_name = 'ANN LEE'
+    assert ann.work_email == email
+    EmployeeRecord.emails.release(email)
@@ -0,0 +1,29 @@
+import gc
+import time
+
+from Employee_class import Employee
+from employee_history import ChangeLog
+
+
+# A new employee reusing the id() of a collected, tracked one must get its own history
+def test_collected_employee_key_not_reused(tmp_path):
+    with ChangeLog(str(tmp_path)) as log:
+        ann = Employee('Ann', 'Lee', '01.01.2020', 20000, 'F')
+        assert log.track(ann) == 'l1'
+        ann.salary = 25000
+        address = id(ann)
+        del ann
+        gc.collect()
+
+        others = []    # kept alive until one of them takes the place of 'ann'
+        while len(others) < 5000:
+            others.append(Employee('Bob', 'Kim', '01.01.2021', 30000, 'M', leave_date='01.01.2022'))
+            if id(others[-1]) == address:
+                break
+        bob = others[-1]
+        bob.salary = 35000
+        assert log.number(bob) == 'l2'
+        state = log.state_at(time.time())
+
+    assert state['l1']['first_name'] == 'Ann' and state['l1']['salary'] == 25000
+    assert state['l2']['first_name'] == 'Bob' and state['l2']['salary'] == 35000
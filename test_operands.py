@@ -0,0 +1,27 @@
+import pytest
+
+import test_operations_new as ton
+
+
+# An unpicklable operand passed under a key of 'obj_factories' must not be replaced by the default object of that key
+def test_portable_objects_keep_caller_operand():
+    objects = {'memoryview1': memoryview(b'xyzw'), 'keys1': {'a': 1}.keys()}
+    portable = ton.portable_objects(objects)
+    assert portable['memoryview1'] is objects['memoryview1']
+    assert portable['keys1'] is objects['keys1']
+
+    results = ton.unary_results({'bytes': 'bytes(copy_self_)', 'list': 'list(copy_self_)'}, objects)
+    assert results['memoryview1'][0] == f"{b'xyzw'}\n{bytes}"
+    assert results['keys1'][1] == f"{['a']}\n{list}"
+
+    columns = ton.binary_columns(None, 'copy_self_ == copy_other', objects, {'other': b'xyzw'})
+    assert columns[0] == [f'True\n{bool}']
+
+def test_portable_objects_rebuild_default_operand():
+    objects = {'memoryview1': ton.def_objects['memoryview1']}
+    assert isinstance(ton.portable_objects(objects)['memoryview1'], ton._Factory)
+    assert isinstance(ton.portable_objects(objects, strict=True)['memoryview1'], ton._Factory)
+
+def test_portable_objects_strict_rejects_caller_operand():
+    with pytest.raises(ValueError):
+        ton.portable_objects({'memoryview1': memoryview(b'xyzw')}, strict=True)
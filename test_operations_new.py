@@ -1,5 +1,22 @@
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
 import copy
+import hashlib
+import io
+import multiprocessing
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import time
+import warnings
+from collections import deque
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 
 
 """
@@ -21,13 +38,48 @@ sheet in an Excel file.
 To avoid messing column heads and row names due to object modification in in-place operations, the actual executions of
 operations/methods/functions use deep copies of the original objects unless the deepcopy method does not work for the
 given object (in this case those are only the memoryview and dictionary view objects that anyway do not change as a
-result of in-place operations).
+result of in-place operations). Deep copies are only made for in-place operations, the methods / functions in
+'mutating_names' and stateful operands (iterators, generators, file handles); all other operations share the original
+objects. Setting 'verify_pure_ops' copies everything again and warns (ImpureOperationWarning) whenever an operation
+classified as pure changed its operands.
 
 Calculation of results for each individual operation/method/function is implemented through 'eval' and 'exec' functions
 to allow looping through operations and only changing the operation/method/function itself in a standard expression.
 
 If an operation/method/function is not defined for the given operand(s)/argument(s) an Exceptionn type is returned. This
 is later used to color-code the Excel sheets based on result type.
+
+Every tester returns a 'ResultMatrix' with the result types and outcomes (ok, error, not_implemented, timeout,
+memory_limit) of all cells as integer coded NumPy arrays of shape (operations, selves, others). Summaries (support per
+type pair, types returning NotImplemented, outcome counts) and the fill colors of the cells ('color_map') are computed
+from those arrays.
+
+The binary testers can share the operations out among a pool of processes ('workers' argument). Objects that cannot be
+pickled (memoryviews, dictionary views, iterators, generators, file handles) are rebuilt inside the workers from their
+factories in 'obj_factories'.
+
+Operands can also be given as an 'OperandRegistry' of named factories (like 'more_objs'), which builds each object only
+when a cell needs it, so importing the module does no work. Stateful operands (iterators, generators, file handles)
+and the operands of mutating operations are built afresh from their factories for every cell instead of being shared
+or used up by the first cell. File operands are in-memory buffers of the file contents ('file_buffer').
+
+With 'timeout' (seconds) and / or 'mem_limit' (bytes) every tester computes the cells in a separate process that is
+killed and restarted when a cell goes over its budget. Such cells are recorded as Timeout() / MemoryLimit() instead of
+stalling the whole run.
+
+With 'stream' the binary testers write each sheet as soon as its operation is computed into a write-only workbook
+instead of collecting the dataframes of all operations first, so memory does not grow with the number of operations.
+
+With 'output' "parquet" / "arrow" the testers write a single long format table instead (columns operation, self_key,
+other_key, result_repr, result_type, outcome) that can be memory-mapped for analysis with 'read_table'. Excel sheets
+can still be made from it with 'table_to_excel'.
+
+With 'cache' (a 'ResultCache') every tester looks the cells up in an on-disk cache keyed by the expression, the type and
+repr of the operands and the interpreter version, only computes the cells that are not there yet and stores them.
+
+Setting 'profiler' to a 'Profiler' times the phases of a run (copy, eval, round, format, frame, write) and the cost of
+every operation and type pair. 'profile_run' does that for a single tester, and running the file with
+--profile [TESTER] [--cprofile FILE] prints the report for the default objects.
 """
 
 bytes0 = b''
@@ -77,10 +129,50 @@ def gen2(x):
         yield x
         x -= 1
         
-more_objs = dict(iterator1=iter(set1), iterator2=iter(bytes2), generator1=gen1(5), generator2=gen2(5),
-                 enumerate1=enumerate(set1), enumerate2=enumerate(bytes2), fhandle1=open('numeric.txt'),
-                 fhandle2=open('download.jpg'), type1 = int, type2=dict, function1=abs, function2=max,
-                 method1=type(complex.conjugate), method2=type(str.upper))
+# Objects given by named factories instead of the objects themselves. Every lookup builds a fresh object, so nothing is
+# created until a cell needs it and stateful objects (iterators, generators, file handles) are never shared between
+# cells. Can be used in place of a dictionary of objects in all testers.
+class OperandRegistry(Mapping):
+    def __init__(self, **factories):
+        self.factories = factories
+
+    def register(self, key, factory):
+        self.factories[key] = factory
+
+    def __getitem__(self, key):
+        return self.factories[key]()
+
+    def __iter__(self):
+        return iter(self.factories)
+
+    def __len__(self):
+        return len(self.factories)
+
+# Contents of a file, read once on first use
+@lru_cache(maxsize=None)
+def _file_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+# In-memory text handle with the contents of the file 'path', in place of a real open file
+def file_buffer(path):
+    return io.TextIOWrapper(io.BytesIO(_file_bytes(path)))
+
+more_objs = OperandRegistry(iterator1=lambda: iter(set1), iterator2=lambda: iter(bytes2), generator1=lambda: gen1(5),
+                            generator2=lambda: gen2(5), enumerate1=lambda: enumerate(set1),
+                            enumerate2=lambda: enumerate(bytes2), fhandle1=lambda: file_buffer('numeric.txt'),
+                            fhandle2=lambda: file_buffer('download.jpg'), type1=lambda: int, type2=lambda: dict,
+                            function1=lambda: abs, function2=lambda: max, method1=lambda: type(complex.conjugate),
+                            method2=lambda: type(str.upper))
+
+# factories rebuilding the objects that cannot be pickled, so that the worker processes of parallel runs ('workers'
+# argument of the binary testers) can recreate them. The keys are those of the objects in 'def_objects' / 'more_objs'.
+obj_factories = dict(memoryview0=lambda: memoryview(bytes0), memoryview1=lambda: memoryview(bytes1),
+                     memoryview2=lambda: memoryview(bytearray1),
+                     keys0=lambda: dict0.keys(), keys1=lambda: dict1.keys(), keys2=lambda: dict2.keys(),
+                     values0=lambda: dict0.values(), values1=lambda: dict1.values(), values2=lambda: dict2.values(),
+                     items0=lambda: dict0.items(), items1=lambda: dict1.items(), items2=lambda: dict2.items(),
+                     **more_objs.factories)
 
 # default operations / methods / functions (unary and binary) to be tested. Any other combination can be feeded into the functions and will work as well.
 def_un_ops = {'-': '-', '+': '+', '~': '~'}
@@ -149,7 +241,38 @@ def_methods = {'add': 'add', 'append': 'append', 'as_integer_ratio': 'as_integer
                'union': 'union', 'update': 'update', 'upper': 'upper', 'values': 'values', 'zfill': 'zfill'}
 
 
+# methods / functions that can change their operands. Together with in-place operators ("IP_" keys) these are the only
+# operations that work on deep copies of the objects.
+mutating_names = {'add', 'append', 'clear', 'difference_update', 'discard', 'extend', 'insert', 'intersection_update',
+                  'pop', 'popitem', 'release', 'remove', 'reverse', 'setdefault', 'sort', 'symmetric_difference_update',
+                  'update', '__delitem__', '__iadd__', '__iand__', '__imul__', '__ior__', '__isub__', '__ixor__',
+                  '__next__', '__setitem__', 'breakpoint', 'delattr', 'next', 'setattr'}
+
+verify_pure_ops = False  # copy the operands of pure operations too and warn if they change
+
+profiler = None  # a 'Profiler' collecting the timings of the run, if any
+
+
 # HELPER FUNCTIONS
+
+# Outcomes of cells that went over the time / memory budget ('timeout' / 'mem_limit' arguments of the testers)
+class Timeout(Exception):
+    pass
+
+class MemoryLimit(Exception):
+    pass
+
+_budget_results = {f'{Timeout()}\n{Timeout}', f'{MemoryLimit()}\n{MemoryLimit}'}  # not to be cached
+
+# Compile an expression / statement once and reuse the code object for every cell of the operation. Sources that do not
+# compile give None, which then fails inside 'try_eval' / 'try_exec_eval' and is recorded as Exception() for every cell.
+@lru_cache(maxsize=None)
+def compile_expr(source, mode='eval'):
+    try:
+        return compile(source, '<operation>', mode)
+    except SyntaxError:
+        return None
+
 def try_deep_copy(obj):
     try:
         copy_obj = copy.deepcopy(obj)
@@ -157,17 +280,19 @@ def try_deep_copy(obj):
         copy_obj = obj
     return copy_obj
 
-# Trying to evalualte an expression. If an exception occurs, it means the given operation / method / function
-# is not supported for the given operand(s)/argument(s)
+# Trying to evalualte an expression (source string or code object from 'compile_expr'). If an exception occurs, it means
+# the given operation / method / function is not supported for the given operand(s)/argument(s)
 def try_eval(expression, copy_self_, copy_other=None):
     try:
         executed = eval(expression)  # calculating the result by executing eval on a standard expression
+    except MemoryError:
+        executed = MemoryLimit()
     except:
         executed = Exception()
     return executed
 
-# Trying to execute a code containing in-place operation. If an exception occurs, it means the given operation
-# is not supported for the given operand(s)/argument(s)
+# Trying to execute a code containing in-place operation (source strings or code objects from 'compile_expr'). If an
+# exception occurs, it means the given operation is not supported for the given operand(s)/argument(s)
 def try_exec_eval(statement, expression, copy_self_, copy_other=None):
     try:
         ldic = locals()
@@ -175,6 +300,8 @@ def try_exec_eval(statement, expression, copy_self_, copy_other=None):
         copy_self_ = ldic['copy_self_']
         copy_other = ldic['copy_other']
         executed = eval(expression)
+    except MemoryError:
+        executed = MemoryLimit()
     except:
         executed = Exception()
     return executed
@@ -188,174 +315,881 @@ def custom_round(obj):
     else:
         return obj
 
-# CORE TEST FUNCTIONS
+# Key of an operand in the cache keys: its type and repr. Operands whose repr shows their address (iterators, generators,
+# file handles, memoryviews, ...) are not the same object in the next run, so they have no key.
+def operand_key(obj):
+    text = repr(obj)
+    if ' at 0x' in text:
+        return None
+    return f'{type(obj)}\0{text}'
 
-# Unary operations
-def unary_ops_test(objects=def_objects, operations=def_un_ops, OUTPUT_FILE='Unary_operations.xlsx'):
-    op_results = {'Operation': [operation for operation in operations]}
+# Text, type and key ('operand_key') of the object 'key' of 'objects' for the heads of the sheets, the type codes of a
+# 'ResultMatrix' and the cache. Objects of an 'OperandRegistry' are built here, so one whose factory fails (a missing
+# file, ...) is described by its error instead of aborting the run; its cells are recorded as errors by 'cell_result'.
+def describe_operand(objects, key):
+    try:
+        obj = objects[key]
+    except Exception as error:
+        return f'{key}: {error!r}', str(type(error)), None
+    return str(obj), str(type(obj)), operand_key(obj)
 
-    for self_ in objects:
-        col_head = f'{objects[self_]}\n{type(objects[self_])})'
-        self_results = []  # list of results in the column 'self_'
+def _head(objects, key):
+    text, type_name, _ = describe_operand(objects, key)
+    return f'{text}\n{type_name}'
 
-        for operation in operations:
-            eval_str = f'{operations[operation]}copy_self_'
-            copy_self_ = try_deep_copy(objects[self_])
-            result = try_eval(eval_str, copy_self_)  # calculating the result by executing eval on a standard expression
-            result = custom_round(result)
-            self_results.append(f'{result}\n{type(result)}')
-        op_results[col_head] = self_results
+# Key of a cell in a 'ResultCache' or None if one of the operands has no key. Unary cells have '' for 'other_key'.
+def cell_key(exec_str, eval_str, self_key, other_key=''):
+    if self_key is None or other_key is None:
+        return None
+    return hashlib.sha256(f'{sys.version}\0{exec_str}\0{eval_str}\0{self_key}\0{other_key}'.encode()).hexdigest()
 
-    pd.DataFrame(op_results).to_excel(OUTPUT_FILE, sheet_name='Unary_operations', index=False, freeze_panes=(1, 1))
+# On-disk (SQLite) cache of formatted cell results. The least recently used cells are evicted once the cached results
+# take more than 'max_bytes'. 'lookup' and 'store' take dictionaries of cell positions (any hashable) and their keys.
+class ResultCache:
+    def __init__(self, path='results_cache.sqlite', max_bytes=256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS cells (key TEXT PRIMARY KEY, result TEXT, size INTEGER, used INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS cells_used ON cells (used)')
+        self.size, self.clock = self.db.execute('SELECT COALESCE(SUM(size), 0), COALESCE(MAX(used), 0) FROM cells').fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-# Binary operations
-def binary_ops_test(selves=def_objects, others=def_objects, operations=def_bin_ops,
-                    OUTPUT_FILE='Binary_operations.xlsx'):
-    # To ensure proper execution keys of in-place operators should start with "IP_"
+    # Cached results of the cells in 'cell_keys' ({position: key}) as {position: result}
+    def lookup(self, cell_keys):
+        keys = list({key for key in cell_keys.values() if key is not None})
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            found.update(self.db.execute(f'SELECT key, result FROM cells WHERE key IN ({marks})', chunk))
+        self.clock += 1
+        self.db.executemany('UPDATE cells SET used = ? WHERE key = ?', ((self.clock, key) for key in found))
+        self.db.commit()
 
-    all_results = {}  # dictionary object with operations as keys and respective dataframes as values.
+        cached = {position: found[key] for position, key in cell_keys.items() if key in found}
+        self.hits += len(cached)
+        self.misses += len(cell_keys) - len(cached)
+        return cached
 
-    for operation in operations:
-        exec_str = 'pass'
-        if operation.startswith('IP_'):
-            exec_str = f'copy_self_ {operations[operation]} copy_other'
-            eval_str = 'copy_self_'
-        else:
-            eval_str = f'copy_self_ {operations[operation]} copy_other'
+    # Store the results ({position: result}) of the cells in 'cell_keys' except those over the time / memory budget and
+    # those showing an address, which would not be the same in the next run either
+    def store(self, cell_keys, results):
+        rows = {}
+        for position, key in cell_keys.items():
+            result = results[position]
+            if key is not None and result not in _budget_results and ' at 0x' not in result:
+                rows[key] = result
+        self.clock += 1
+        for key, result in rows.items():
+            size = len(key) + len(result.encode())
+            old_size = self.db.execute('SELECT size FROM cells WHERE key = ?', (key,)).fetchone()
+            self.size += size - (old_size[0] if old_size else 0)
+            self.db.execute('INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?)', (key, result, size, self.clock))
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes:
+            oldest = self.db.execute('SELECT key, size FROM cells ORDER BY used LIMIT 1000').fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if self.size <= self.max_bytes:
+                    break
+                self.db.execute('DELETE FROM cells WHERE key = ?', (key,))
+                self.size -= size
+                self.evictions += 1
+        self.db.commit()
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return (f'Result cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {self.evictions} evicted, '
+                f'{self.size / 2 ** 20:.1f} MB of {self.max_bytes / 2 ** 20:.1f} MB used')
+
+    def close(self):
+        self.db.close()
 
-        op_results = {'Other': [f'{others[other]}\n{type(others[other])}' for other in others]}
+# Placeholder for an object that is built by its factory (from an 'OperandRegistry' or 'obj_factories') when it is
+# needed. Only the key is pickled; the worker processes look the factory up in 'obj_factories'.
+class _Factory:
+    def __init__(self, key, factory=None):
+        self.key = key
+        self.factory = factory
 
-        for self_ in selves:
-            col_head = f'{selves[self_]}\n{type(selves[self_])})'
-            self_results = []  # list of results in the column 'self_'
-            for other in others:
-                copy_self_ = try_deep_copy(selves[self_])
-                copy_other = try_deep_copy(others[other])
-                result = try_exec_eval(exec_str, eval_str, copy_self_, copy_other)
-                result = custom_round(result)
-                self_results.append(f'{result}\n{type(result)}')
-            op_results[col_head] = self_results
+    def __call__(self):
+        return (self.factory or obj_factories[self.key])()
 
-        all_results[operation] = pd.DataFrame(op_results)
+    def __getstate__(self):
+        return {'key': self.key, 'factory': None}
 
-    writer = pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='w')  # a writer object to write multiple sheets
-    workbook = writer.book
+    def __repr__(self):
+        return f'<{self.key} factory>'
 
-    for operation in all_results:
+# Replace the objects that cannot be pickled by placeholders of their factories. Objects of an 'OperandRegistry' are all
+# replaced by placeholders, so none is built here. Other objects are only replaced when they are the default objects
+# ('def_objects') their 'obj_factories' rebuild, as the factory of a key would give another object in place of one the
+# caller passed under the same key. With 'strict' (objects going to worker processes) registry objects whose factories
+# are not in 'obj_factories' have to be pickled instead, and an object that can be neither pickled nor rebuilt raises
+# ValueError; otherwise it is kept as it is.
+def portable_objects(objects, strict=False):
+    registry = isinstance(objects, OperandRegistry)
+    portable = {}
+    for key in objects:
+        if registry and (not strict or obj_factories.get(key) is objects.factories[key]):
+            portable[key] = _Factory(key, objects.factories[key])
+            continue
+        obj = objects[key]
         try:
-            workbook.remove(workbook[operation])
-        except:
-            pass
-        all_results[operation].to_excel(writer, sheet_name=operation, index=False, freeze_panes=(1, 1))
+            pickle.dumps(obj)
+            portable[key] = obj
+        except Exception:
+            if not registry and key in obj_factories and obj is def_objects.get(key):
+                portable[key] = _Factory(key)
+            elif strict:
+                raise ValueError(f'{key} cannot be pickled for the worker processes and obj_factories cannot rebuild '
+                                 f'it. Pass it in an OperandRegistry with a factory in obj_factories.')
+            else:
+                portable[key] = obj
+    return portable
 
-    writer.save()
+# Factories of the objects with placeholders, None for the others
+def object_factories(objects):
+    return {key: obj if isinstance(obj, _Factory) else None for key, obj in objects.items()}
 
-# unary methods (methods only requiring self as an argument)
-def unary_meth_test(objects=def_objects, methods=def_methods, OUTPUT_FILE='Unary_methods.xlsx'):
-    meth_results = {'Method': [method for method in methods]}
+class ImpureOperationWarning(UserWarning):
+    pass
 
-    for self_ in objects:
-        col_head = f'{objects[self_]}\n{type(objects[self_])})'
-        self_results = []  # list of results in the column 'self_'
+# Whether an operation can change its operands: an in-place statement or a call of one of 'mutating_names'
+def is_mutating(exec_str, eval_str):
+    if exec_str not in (None, 'pass'):
+        return True
+    return any(name in mutating_names for name in re.findall(r'(\w+)\(', eval_str))
 
-        for method in methods:
-            eval_str = f'copy_self_.{methods[method]}()'
-            copy_self_ = try_deep_copy(objects[self_])
-            result = try_eval(eval_str, copy_self_)  # calculating the result by executing eval on a standard expression
-            result = custom_round(result)
-            self_results.append(f'{result}\n{type(result)}')
-        meth_results[col_head] = self_results
+# Whether an operation needs deep copies of its operands: mutating operations and identity checks, which should not see
+# 'self' and 'other' as the same object just because they share it
+def needs_copies(exec_str, eval_str):
+    return is_mutating(exec_str, eval_str) or re.search(r'\bis\b', eval_str) is not None
 
-    pd.DataFrame(meth_results).to_excel(OUTPUT_FILE, sheet_name='Unary_methods', index=False, freeze_panes=(1, 1))
+# Operands that change by just being used (iterators, generators, file handles) are copied for every cell. Objects with
+# a factory are built afresh for every cell instead, which also works for those that cannot be deep-copied. Only these
+# are ever built, so a failing factory only fails the cells of its object.
+def _operand(obj, copy_obj, factory=None):
+    if factory is not None:
+        return factory()
+    if not copy_obj and not isinstance(obj, Iterator):
+        return obj
+    return try_deep_copy(obj)
 
-# binary methods (requiring another argument in addition to self)
-def binary_meth_test(selves=def_objects, others=def_objects, methods=def_methods, OUTPUT_FILE='Binary_methods.xlsx'):
-    all_results = {}  # dictionary object with methods as keys and respective dataframes as values.
+def _fingerprint(obj):
+    try:
+        return pickle.dumps(obj)
+    except Exception:
+        return repr(obj)
 
-    for method in methods:
+# Time spent in each phase of a run and cost of every operation and type pair, collected while 'profiler' is set to an
+# instance (see 'profile_run'). The cell phases are copy (deep copies / fresh operands), eval, round and format, the
+# output phases frame (dataframe construction) and write (Excel / table writing). Only cells computed in the main process
+# are timed, not those of worker processes or sandboxes.
+class Profiler:
+    phases = ('copy', 'eval', 'round', 'format', 'frame', 'write')
 
-        eval_str = f'copy_self_.{methods[method]}(copy_other)'
+    def __init__(self):
+        self.times = dict.fromkeys(self.phases, 0.0)
+        self.cells = 0
+        self.op_costs = {}  # {operation: seconds}
+        self.pair_costs = {}  # {(self type, other type): seconds}
+        self.names = {}  # {(exec_str, eval_str): operation key}
 
-        meth_results = {'Other': [f'{others[other]}\n{type(others[other])}' for other in others]}
+    def name_expressions(self, expressions):
+        for key, expression in expressions.items():
+            self.names[expression if isinstance(expression, tuple) else (None, expression)] = key
 
-        for self_ in selves:
-            col_head = f'{selves[self_]}\n{type(selves[self_])})'
-            self_results = []  # list of results in the column 'self'
-            for other in others:
-                copy_self_ = try_deep_copy(selves[self_])
-                copy_other = try_deep_copy(others[other])
-                result = try_eval(eval_str, copy_self_, copy_other)  # calculating the result by executing eval on a standard expression
-                result = custom_round(result)
-                self_results.append(f'{result}\n{type(result)}')
-            meth_results[col_head] = self_results
+    def add(self, phase, seconds):
+        self.times[phase] += seconds
 
-        all_results[method] = pd.DataFrame(meth_results)
+    def add_cell(self, exec_str, eval_str, self_obj, other_obj, stamps):
+        for phase, start, end in zip(self.phases, stamps, stamps[1:]):
+            self.times[phase] += end - start
+        cost = stamps[-1] - stamps[0]
+        operation = self.names.get((exec_str, eval_str), eval_str)
+        pair = (type(self_obj).__name__, type(other_obj).__name__)
+        self.op_costs[operation] = self.op_costs.get(operation, 0.0) + cost
+        self.pair_costs[pair] = self.pair_costs.get(pair, 0.0) + cost
+        self.cells += 1
 
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='w') as writer:  # a writer object to write multiple sheets
-        workbook = writer.book
-    
-        for method in all_results:
+    # Text report of the phase times and histograms of the 'top' most expensive operations and type pairs
+    def report(self, top=10, width=40):
+        total = sum(self.times.values())
+        lines = [f'{self.cells} cells, {total:.3f} s timed']
+        for phase, seconds in self.times.items():
+            lines.append(f'  {phase:<8} {seconds:9.3f} s {seconds / total * 100 if total else 0:6.1f}%')
+        for title, costs in (('operations', self.op_costs), ('type pairs', self.pair_costs)):
+            lines.append(f'Most expensive {title}:')
+            ranked = sorted(costs.items(), key=lambda item: item[1], reverse=True)[:top]
+            most = ranked[0][1] if ranked else 0
+            for name, seconds in ranked:
+                name = ' x '.join(name) if isinstance(name, tuple) else name
+                bar = '#' * round(seconds / most * width) if most else ''
+                lines.append(f'  {name[:30]:<30} {seconds:9.4f} s {bar}')
+        return '\n'.join(lines)
+
+# Time the block as the phase 'name' of the current 'profiler'
+@contextmanager
+def _phase(name):
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, time.perf_counter() - start)
+
+# Result of a single cell formatted for the dataframes. Without 'exec_str' the expression is evaluated directly. Only
+# mutating operations get deep copies of the operands ('copies', from 'needs_copies' unless given). Operands with
+# factories ('factories', pair of factories or None, the objects being their placeholders) are built once for the cell,
+# and a single object serves as both operands when they have the same factory, as an object that cannot be deep-copied
+# is the same on both sides. A factory that fails gives an Exception() cell like a failing operation.
+def cell_result(exec_str, eval_str, self_obj, other_obj=None, copies=None, factories=(None, None)):
+    if copies is None:
+        copies = needs_copies(exec_str, eval_str)
+    verify = verify_pure_ops and not copies
+    if profiler is not None:
+        stamps = [time.perf_counter()]
+    try:
+        copy_self_ = _operand(self_obj, copies or verify, factories[0])
+        if factories[1] is not None and factories[1] is factories[0]:
+            copy_other = copy_self_
+        else:
+            copy_other = _operand(other_obj, copies or verify, factories[1])
+    except Exception:
+        result = Exception()
+        return f'{result}\n{type(result)}'
+    if verify:
+        before = (_fingerprint(copy_self_), _fingerprint(copy_other))
+    if profiler is not None:
+        stamps.append(time.perf_counter())
+
+    if exec_str is None:
+        result = try_eval(compile_expr(eval_str), copy_self_, copy_other)  # calculating the result by executing eval on a standard expression
+    else:
+        result = try_exec_eval(compile_expr(exec_str, 'exec'), compile_expr(eval_str), copy_self_, copy_other)
+
+    if verify and (_fingerprint(copy_self_), _fingerprint(copy_other)) != before:
+        warnings.warn(f'{eval_str!r} is classified as pure but changed its operands {self_obj!r}, {other_obj!r}. Add it '
+                      f'to mutating_names.', ImpureOperationWarning)
+    if profiler is None:
+        result = custom_round(result)
+        return f'{result}\n{type(result)}'
+
+    stamps.append(time.perf_counter())
+    result = custom_round(result)
+    stamps.append(time.perf_counter())
+    text = f'{result}\n{type(result)}'
+    stamps.append(time.perf_counter())
+    profiler.add_cell(exec_str, eval_str, copy_self_, copy_other, stamps)
+    return text
+
+# Limit the address space of the current process to what it uses now plus 'mem_limit' bytes (Unix only).
+def _limit_memory(mem_limit):
+    import resource
+    try:
+        with open('/proc/self/statm') as statm:
+            used = int(statm.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        used = 0
+    resource.setrlimit(resource.RLIMIT_AS, (used + mem_limit, resource.RLIM_INFINITY))
+
+# Main loop of a sandbox process: computes the cells sent by 'CellSandbox.run' by the keys of their objects. As in
+# 'binary_columns', objects with factories are built by 'cell_result' for every cell.
+def _sandbox_main(conn, selves, others, mem_limit):
+    if mem_limit is not None:
+        _limit_memory(mem_limit)
+    operation = None
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        exec_str, eval_str, self_, other = task
+        if (exec_str, eval_str) != operation:
+            operation = (exec_str, eval_str)
+            copies = needs_copies(exec_str, eval_str)
+        other_obj = None if other is None else others[other]
+        factories = (_object_factory(selves, self_), None if other is None else _object_factory(others, other))
+        conn.send(cell_result(exec_str, eval_str, selves[self_], other_obj, copies, factories))
+    conn.close()
+
+def _object_factory(objects, key):
+    return objects[key] if isinstance(objects[key], _Factory) else None
+
+# Computes cells in a separate process that is killed and restarted when a cell runs longer than 'timeout' seconds, so a
+# pathological cell only costs its budget. With 'mem_limit' (bytes) the process cannot allocate more than that on top of
+# what it uses at start. Such cells are recorded as Timeout() / MemoryLimit(), and a crashed process as Exception().
+class CellSandbox:
+    def __init__(self, selves, others=None, timeout=None, mem_limit=None, cache=None):
+        self.selves = portable_objects(selves)
+        if others is None or others is selves:
+            self.others = self.selves if others is selves else None
+        else:
+            self.others = portable_objects(others)
+        self.timeout = timeout
+        self.mem_limit = mem_limit
+        self._process = None
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start(self):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_sandbox_main, daemon=True,
+                                                args=(child_conn, self.selves, self.others, self.mem_limit))
+        self._process.start()
+        child_conn.close()
+
+    def _kill(self):
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = None
+
+    def run(self, exec_str, eval_str, self_, other=None):
+        if self._process is None:
+            self._start()
+        self._conn.send((exec_str, eval_str, self_, other))
+        if self._conn.poll(self.timeout):
             try:
-                workbook.remove(workbook[method])
-            except:
-                pass
-            all_results[method].to_excel(writer, sheet_name=method, index=False, freeze_panes=(1, 1))
-    
-        writer.save()
+                return self._conn.recv()
+            except EOFError:  # the process died
+                result = Exception()
+        else:
+            result = Timeout()
+        self._kill()
+        return f'{result}\n{type(result)}'
 
-# unary functions (functions only requiring one argument)
-def unary_func_test(objects=def_objects, functions=def_funcs, OUTPUT_FILE='Unary_functions.xlsx'):
-    func_results = {'Function': [function for function in functions]}
+    def close(self):
+        if self._process is not None:
+            self._conn.send(None)
+            self._process.join()
+            self._conn.close()
+            self._process = None
+
+# Results of a single binary operation / method / function: a list for each object in 'selves' with the results for all
+# objects in 'others'. Objects with factories are built afresh for every cell, so the results do not depend on the order
+# (or the process) the cells are run in, and a failing factory only fails its own cells. Without 'exec_str' the
+# expression is evaluated directly. With 'timeout' / 'mem_limit' the cells are computed in a 'CellSandbox'. Cells in
+# 'known' ({(self_, other): result}) are not recomputed.
+def binary_columns(exec_str, eval_str, selves, others, timeout=None, mem_limit=None, known=None):
+    known = known or {}
+    if timeout is not None or mem_limit is not None:
+        with CellSandbox(selves, others, timeout, mem_limit) as sandbox:
+            return [[known[self_, other] if (self_, other) in known else sandbox.run(exec_str, eval_str, self_, other)
+                     for other in others] for self_ in selves]
+
+    self_factories = object_factories(selves)
+    other_factories = self_factories if others is selves else object_factories(others)
+    copies = needs_copies(exec_str, eval_str)
+
+    columns = []
+    for self_ in selves:
+        self_results = []  # list of results in the column 'self_'
+        for other in others:
+            if (self_, other) in known:
+                self_results.append(known[self_, other])
+            else:
+                factories = (self_factories[self_], other_factories[other])
+                self_results.append(cell_result(exec_str, eval_str, selves[self_], others[other], copies, factories))
+        columns.append(self_results)
+    return columns
+
+_worker_args = None  # (selves, others, timeout, mem_limit) of a worker process
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+def _binary_columns_worker(task):
+    exec_str, eval_str, known = task
+    return binary_columns(exec_str, eval_str, *_worker_args, known)
+
+# Results of all binary operations / methods / functions in 'expressions' ({key: (exec_str, eval_str)}) as pairs of the
+# key and the columns from 'binary_columns', one operation at a time and in the same order. With 'workers' > 1 the
+# operations are shared out among a pool of processes, each computing whole operations, with a few operations in flight
+# at a time. With 'cache' only the cells missing from the 'ResultCache' are computed, with 'matrix' the result types of
+# every operation are recorded into the 'ResultMatrix'.
+def iter_binary_columns(expressions, selves, others, workers=None, timeout=None, mem_limit=None, cache=None,
+                        matrix=None):
+    parallel = workers is not None and workers > 1
+    portable_selves = portable_objects(selves, strict=parallel)
+    portable_others = portable_selves if others is selves else portable_objects(others, strict=parallel)
+    if cache is not None:
+        self_keys = {self_: describe_operand(selves, self_)[2] for self_ in selves}
+        other_keys = {other: describe_operand(others, other)[2] for other in others}
+
+    def lookup(key):  # cell keys ({(self_, other): cell key}) and cached results of the operation
+        if cache is None:
+            return {}, {}
+        cell_keys = {(self_, other): cell_key(*expressions[key], self_keys[self_], other_keys[other])
+                     for self_ in selves for other in others}
+        return cell_keys, cache.lookup(cell_keys)
+
+    def store(cell_keys, known, columns):
+        if cache is not None:
+            results = {}
+            for self_, self_results in zip(selves, columns):
+                for other, result in zip(others, self_results):
+                    if (self_, other) not in known:
+                        results[self_, other] = result
+            cache.store({position: cell_keys[position] for position in results}, results)
+
+    def finish(key, cell_keys, known, future):
+        columns = future.result()
+        store(cell_keys, known, columns)
+        if matrix is not None:
+            matrix.record(key, columns)
+        return key, columns
+
+    if parallel:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(portable_selves, portable_others, timeout, mem_limit)) as pool:
+            pending = deque()
+            for key in expressions:
+                cell_keys, known = lookup(key)
+                pending.append((key, cell_keys, known, pool.submit(_binary_columns_worker, (*expressions[key], known))))
+                if len(pending) > 2 * workers:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+    else:
+        for key in expressions:
+            cell_keys, known = lookup(key)
+            columns = binary_columns(*expressions[key], portable_selves, portable_others, timeout, mem_limit, known)
+            store(cell_keys, known, columns)
+            if matrix is not None:
+                matrix.record(key, columns)
+            yield key, columns
 
+def _heads(selves, others):
+    row_heads = [_head(others, other) for other in others]
+    col_heads = [f'{_head(selves, self_)})' for self_ in selves]
+    return row_heads, col_heads
+
+# Dataframes of all binary operations / methods / functions in 'expressions' (arguments as in 'iter_binary_columns')
+def binary_frames(expressions, selves, others, workers=None, timeout=None, mem_limit=None, cache=None, matrix=None):
+    row_heads, col_heads = _heads(selves, others)
+    all_results = {}
+    for key, columns in iter_binary_columns(expressions, selves, others, workers, timeout, mem_limit, cache, matrix):
+        with _phase('frame'):
+            results = {'Other': row_heads}
+            results.update(zip(col_heads, columns))
+            all_results[key] = pd.DataFrame(results)
+    return all_results
+
+# Sheets of all binary operations / methods / functions in 'expressions' (arguments as in 'iter_binary_columns') as
+# pairs of the key and a generator of the rows, laid out like the dataframes of 'binary_frames'. Each operation is only
+# computed when its sheet is reached and can be dropped once its rows are written.
+def binary_sheets(expressions, selves, others, workers=None, timeout=None, mem_limit=None, cache=None, matrix=None):
+    row_heads, col_heads = _heads(selves, others)
+    for key, columns in iter_binary_columns(expressions, selves, others, workers, timeout, mem_limit, cache, matrix):
+        yield key, _sheet_rows(row_heads, dict(zip(col_heads, columns)))
+
+def _sheet_rows(row_heads, results, first_col='Other'):
+    yield [first_col, *results]
+    for i, row_head in enumerate(row_heads):
+        yield [row_head, *(self_results[i] for self_results in results.values())]
+
+# Write sheets ((name, rows) pairs) one row at a time into a write-only workbook, which keeps the rows in temporary files
+# instead of memory. Peak memory stays that of a single operation however many sheets there are.
+def write_sheets(sheets, OUTPUT_FILE):
+    workbook = Workbook(write_only=True)
+    for name, rows in sheets:
+        with _phase('write'):
+            sheet = workbook.create_sheet(title=name)
+            sheet.freeze_panes = 'B2'
+            for row in rows:
+                sheet.append(row)
+    with _phase('write'):
+        workbook.save(OUTPUT_FILE)
+
+# Results of unary operations / methods / functions in 'expressions' ({key: eval_str}) as a dictionary with a list of
+# results for each key in 'objects'. With 'timeout' / 'mem_limit' the cells are computed in a 'CellSandbox', with
+# 'cache' only the cells missing from the 'ResultCache' are computed.
+def unary_results(expressions, objects, timeout=None, mem_limit=None, cache=None):
+    sandbox = None
+    if timeout is not None or mem_limit is not None:
+        sandbox = CellSandbox(objects, None, timeout, mem_limit)
+    else:
+        portable = portable_objects(objects)
+        factories = object_factories(portable)
+
+    cell_keys = {}  # {(self_, expression key): cell key}
+    known = {}
+    if cache is not None:
+        for self_ in objects:
+            self_key = describe_operand(objects, self_)[2]
+            for key in expressions:
+                cell_keys[self_, key] = cell_key(None, expressions[key], self_key)
+        known = cache.lookup(cell_keys)
+
+    copies = {key: needs_copies(None, expressions[key]) for key in expressions}
+    results = {}
+    computed = {}
     for self_ in objects:
-        col_head = f'{objects[self_]}\n{type(objects[self_])})'
         self_results = []  # list of results in the column 'self_'
+        for key in expressions:
+            if (self_, key) in known:
+                self_results.append(known[self_, key])
+                continue
+            if sandbox is None:
+                result = cell_result(None, expressions[key], portable[self_], copies=copies[key],
+                                     factories=(factories[self_], None))
+            else:
+                result = sandbox.run(None, expressions[key], self_)
+            computed[self_, key] = result
+            self_results.append(result)
+        results[self_] = self_results
 
-        for function in functions:
-            eval_str = f'{functions[function]}(copy_self_)'
-            copy_self_ = try_deep_copy(objects[self_])
-            result = try_eval(eval_str, copy_self_)  # calculating the result by executing eval on a standard expression
-            result = custom_round(result)
-            self_results.append(f'{result}\n{type(result)}')
-        func_results[col_head] = self_results
+    if sandbox is not None:
+        sandbox.close()
+    if cache is not None:
+        cache.store({position: cell_keys[position] for position in computed}, computed)
+    return results
 
-    pd.DataFrame(func_results).to_excel(OUTPUT_FILE, sheet_name='Unary_functions', index=False, freeze_panes=(1, 1))
+# Outcome of a cell from the type of its result
+def cell_outcome(result_type):
+    if result_type == str(Exception):
+        return 'error'
+    if result_type == str(Timeout):
+        return 'timeout'
+    if result_type == str(MemoryLimit):
+        return 'memory_limit'
+    if result_type == str(type(NotImplemented)):
+        return 'not_implemented'
+    return 'ok'
 
-# binary functions (requiring two arguments)
-def binary_func_test(selves=def_objects, others=def_objects, functions=def_funcs, OUTPUT_FILE='Binary_functions.xlsx'):
-    all_results = {}  # dictionary object with methods as keys and respective dataframes as values.
+outcome_names = ('ok', 'error', 'not_implemented', 'timeout', 'memory_limit')
+outcome_colors = ('C6EFCE', 'FFC7CE', 'FFEB9C', 'D9D9D9', 'BDD7EE')  # Excel fill colors (RGB) of the outcomes
 
-    for function in functions:
+# Result types and outcomes of a run as integer coded NumPy arrays of shape (operations, selves, others), so the support
+# matrix can be summarised and sliced without re-parsing the formatted results. 'types' indexes 'type_names' and
+# 'outcomes' indexes 'outcome_names'; 'self_types' / 'other_types' are the type codes of the operands. Unary runs have a
+# single 'other' (None).
+class ResultMatrix:
+    def __init__(self, operations, selves, others=None):
+        self.operations = list(operations)
+        self.selves = list(selves)
+        self.others = [None] if others is None else list(others)
+        self.type_names = []
+        self._type_codes = {}
+        self._op_index = {key: i for i, key in enumerate(self.operations)}
+        shape = (len(self.operations), len(self.selves), len(self.others))
+        self.types = np.zeros(shape, dtype=np.int32)
+        self.self_types = np.array([self.type_code(describe_operand(selves, self_)[1]) for self_ in selves],
+                                   dtype=np.int32)
+        if others is None:
+            self.other_types = np.array([self.type_code(str(type(None)))], dtype=np.int32)
+        else:
+            self.other_types = np.array([self.type_code(describe_operand(others, other)[1]) for other in others],
+                                        dtype=np.int32)
 
-        eval_str = f'{functions[function]}(copy_self_, copy_other)'
+    def type_code(self, type_name):
+        code = self._type_codes.get(type_name)
+        if code is None:
+            code = self._type_codes[type_name] = len(self.type_names)
+            self.type_names.append(type_name)
+        return code
 
-        func_results = {'Other': [f'{others[other]}\n{type(others[other])}' for other in others]}
+    # Record the formatted results of the operation 'key' (a list of results over the others for each self)
+    def record(self, key, columns):
+        codes = self._type_codes
+        types = self.types[self._op_index[key]]
+        for j, self_results in enumerate(columns):
+            for k, result in enumerate(self_results):
+                type_name = result.rpartition('\n')[2]
+                code = codes.get(type_name)
+                types[j, k] = self.type_code(type_name) if code is None else code
 
-        for self_ in selves:
-            col_head = f'{selves[self_]}\n{type(selves[self_])})'
-            self_results = []  # list of results in the column 'self'
-            for other in others:
-                copy_self_ = try_deep_copy(selves[self_])
-                copy_other = try_deep_copy(others[other])
-                result = try_eval(eval_str, copy_self_, copy_other)  # calculating the result by executing eval on a standard expression
-                result = custom_round(result)
-                self_results.append(f'{result}\n{type(result)}')
-            func_results[col_head] = self_results
+    @property
+    def outcomes(self):
+        by_type = np.array([outcome_names.index(cell_outcome(type_name)) for type_name in self.type_names],
+                           dtype=np.int8)
+        return by_type[self.types]
 
-        all_results[function] = pd.DataFrame(func_results)
+    def _select(self, array, operations):
+        if operations is None:
+            return array
+        if isinstance(operations, str):
+            operations = [operations]
+        return array[[self._op_index[key] for key in operations]]
+
+    # Percentage of the cells of 'operations' (all by default, or a key or list of keys) that are supported (outcome 'ok')
+    # for each pair of self and other types, as a dataframe with the self types along the rows
+    def support_by_type_pair(self, operations=None):
+        supported = self._select(self.outcomes, operations) == outcome_names.index('ok')
+        n = len(self.type_names)
+        pairs = np.broadcast_to(self.self_types[:, None] * n + self.other_types[None, :], supported.shape).ravel()
+        totals = np.bincount(pairs, minlength=n * n).reshape(n, n)
+        hits = np.bincount(pairs, weights=supported.ravel(), minlength=n * n).reshape(n, n)
+        used_selves = np.unique(self.self_types)
+        used_others = np.unique(self.other_types)
+        with np.errstate(invalid='ignore'):
+            percent = 100 * hits / totals
+        return pd.DataFrame(percent[np.ix_(used_selves, used_others)],
+                            index=[self.type_names[code] for code in used_selves],
+                            columns=[self.type_names[code] for code in used_others])
+
+    # Self types for which the operation 'key' returns NotImplemented with any other operand
+    def not_implemented(self, key):
+        outcomes = self.outcomes[self._op_index[key]]
+        mask = (outcomes == outcome_names.index('not_implemented')).any(axis=1)
+        return [self.type_names[code] for code in np.unique(self.self_types[mask])]
+
+    # Outcome counts for each operation as a dataframe with the operations along the rows and 'outcome_names' along
+    # the columns
+    def outcome_counts(self):
+        outcomes = self.outcomes.reshape(len(self.operations), -1)
+        offsets = np.arange(len(self.operations))[:, None] * len(outcome_names)
+        counts = np.bincount((outcomes + offsets).ravel(), minlength=len(self.operations) * len(outcome_names))
+        return pd.DataFrame(counts.reshape(len(self.operations), len(outcome_names)), index=self.operations,
+                            columns=outcome_names)
+
+    # Fill colors ('outcome_colors') of all cells, an array of the same shape as 'types'
+    def color_map(self, operations=None):
+        return np.array(outcome_colors)[self._select(self.outcomes, operations)]
+
+table_columns = ('operation', 'self_key', 'other_key', 'result_repr', 'result_type', 'outcome')
+
+# A formatted result of 'cell_result' ('{result}\n{type}') as its 'result_repr' and 'result_type' columns in a table,
+# and back. The sheets written from a table show the cells as the testers write them.
+def split_cell(result):
+    result_repr, _, result_type = result.rpartition('\n')
+    return result_repr, result_type
+
+def format_cell(result_repr, result_type):
+    return f'{result_repr}\n{result_type}'
+
+# Name of the table file written instead of OUTPUT_FILE for the 'parquet' / 'arrow' outputs of the testers
+def table_file(OUTPUT_FILE, output):
+    extensions = {'parquet': '.parquet', 'arrow': '.arrow'}
+    if output not in extensions:
+        raise ValueError(f'output should be "excel", "parquet" or "arrow", not {output!r}.')
+    return os.path.splitext(OUTPUT_FILE)[0] + extensions[output]
+
+# Write cells ((operation, self_key, other_key, formatted result) tuples, other_key None for unary cells) into a long
+# format table with 'table_columns' as a Parquet file or an Arrow IPC file (by the extension of 'TABLE_FILE'). The cells
+# are written in batches, so they can come from a generator without being held in memory. 'result_repr' is the result
+# as shown in the sheets.
+def write_table(cells, TABLE_FILE, batch_size=65536):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in table_columns])
+    if TABLE_FILE.endswith('.parquet'):
+        writer = pq.ParquetWriter(TABLE_FILE, schema)
+    else:
+        writer = pa.ipc.new_file(TABLE_FILE, schema)
+
+    batch = {column: [] for column in table_columns}
+    for operation, self_, other, result in cells:
+        result_repr, result_type = split_cell(result)
+        for column, value in zip(table_columns, (operation, self_, other, result_repr, result_type,
+                                                 cell_outcome(result_type))):
+            batch[column].append(value)
+        if len(batch['operation']) >= batch_size:
+            with _phase('write'):
+                writer.write_table(pa.table(batch, schema=schema))
+            batch = {column: [] for column in table_columns}
+    with _phase('write'):
+        if batch['operation'] or isinstance(writer, pq.ParquetWriter):
+            writer.write_table(pa.table(batch, schema=schema))
+        writer.close()
+
+# Table written by 'write_table' as a pyarrow Table, memory-mapped rather than read into memory
+def read_table(TABLE_FILE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if TABLE_FILE.endswith('.parquet'):
+        return pq.read_table(TABLE_FILE, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(TABLE_FILE)).read_all()
+
+# Excel view of a table written by 'write_table': a sheet per operation with the 'other_key's along the rows and the
+# 'self_key's along the columns for binary tables, a single sheet 'sheet_name' with the operations along the rows for
+# unary tables. The sheets are streamed through 'write_sheets'.
+def table_to_excel(TABLE_FILE, OUTPUT_FILE, sheet_name='Results'):
+    import pyarrow.compute as pc
+
+    table = read_table(TABLE_FILE)
+    operations = pc.unique(table['operation']).to_pylist()
+
+    # Rows of a sheet with the 'row_column' values along the rows and the 'self_key's along the columns, laid out by
+    # '_sheet_rows'
+    def sheet(part, row_column, first_col):
+        columns = part.select(['self_key', row_column, 'result_repr', 'result_type']).to_pydict()
+        results = {}
+        for self_, row, result in zip(columns['self_key'], columns[row_column],
+                                      map(format_cell, columns['result_repr'], columns['result_type'])):
+            results.setdefault(self_, {})[row] = result
+        rows = list(dict.fromkeys(row for self_results in results.values() for row in self_results))
+        results = {self_: [self_results.get(row) for row in rows] for self_, self_results in results.items()}
+        return _sheet_rows(rows, results, first_col)
+
+    if table['other_key'].null_count == len(table):
+        write_sheets([(sheet_name, sheet(table, 'operation', 'Operation'))], OUTPUT_FILE)
+    else:
+        write_sheets(((operation, sheet(table.filter(pc.equal(table['operation'], operation)), 'other_key', 'Other'))
+                      for operation in operations), OUTPUT_FILE)
 
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='w') as writer:  # a writer object to write multiple sheets
+# Write dataframes ({sheet name: dataframe}) into an Excel file, a sheet each
+def write_frames(all_results, OUTPUT_FILE):
+    with _phase('write'), pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='w') as writer:  # a writer object to write multiple sheets
         workbook = writer.book
-    
-        for function in all_results:
+
+        for key in all_results:
             try:
-                workbook.remove(workbook[function])
+                workbook.remove(workbook[key])
             except:
                 pass
-            all_results[function].to_excel(writer, sheet_name=function, index=False, freeze_panes=(1, 1))
-    
-        writer.save()
+            all_results[key].to_excel(writer, sheet_name=key, index=False, freeze_panes=(1, 1))
+
+# CORE TEST FUNCTIONS
+
+# Common part of the unary testers: results of 'expressions' ({key: eval_str}) for all 'objects', written into a single
+# sheet 'sheet_name' of an Excel file with the expression keys in the first column 'first_col' ('output' "excel") or
+# into a table (see 'write_table', 'output' "parquet" / "arrow"). Returns the 'ResultMatrix' of the run.
+def unary_test(expressions, objects, first_col, sheet_name, OUTPUT_FILE, timeout, mem_limit, cache, output):
+    if profiler is not None:
+        profiler.name_expressions(expressions)
+    results = unary_results(expressions, objects, timeout, mem_limit, cache)
+    matrix = ResultMatrix(expressions, objects)
+    for i, key in enumerate(expressions):
+        matrix.record(key, [[results[self_][i]] for self_ in objects])
+
+    if output == 'excel':
+        with _phase('frame'):
+            sheet = {first_col: list(expressions)}
+            sheet.update((f'{_head(objects, self_)})', results[self_]) for self_ in objects)
+            frame = pd.DataFrame(sheet)
+        with _phase('write'):
+            frame.to_excel(OUTPUT_FILE, sheet_name=sheet_name, index=False, freeze_panes=(1, 1))
+    else:
+        cells = ((key, self_, None, results[self_][i]) for i, key in enumerate(expressions) for self_ in objects)
+        write_table(cells, table_file(OUTPUT_FILE, output))
+
+    if cache is not None:
+        print(cache.report())
+    return matrix
+
+# Common part of the binary testers: results of 'expressions' ({key: (exec_str, eval_str)}) for all 'selves' and 'others',
+# written into an Excel file with a sheet per expression key ('output' "excel") or into a table (see 'write_table',
+# 'output' "parquet" / "arrow"). Returns the 'ResultMatrix' of the run.
+def binary_test(expressions, selves, others, OUTPUT_FILE, workers, timeout, mem_limit, cache, stream, output):
+    if profiler is not None:
+        profiler.name_expressions(expressions)
+    matrix = ResultMatrix(expressions, selves, others)
+    if output != 'excel':
+        cells = ((key, self_, other, result)
+                 for key, columns in iter_binary_columns(expressions, selves, others, workers, timeout, mem_limit, cache,
+                                                         matrix)
+                 for self_, self_results in zip(selves, columns) for other, result in zip(others, self_results))
+        write_table(cells, table_file(OUTPUT_FILE, output))
+    elif stream:  # sheets are written one at a time as they are computed
+        write_sheets(binary_sheets(expressions, selves, others, workers, timeout, mem_limit, cache, matrix), OUTPUT_FILE)
+    else:
+        # dictionary object with operations as keys and respective dataframes as values.
+        all_results = binary_frames(expressions, selves, others, workers, timeout, mem_limit, cache, matrix)
+        write_frames(all_results, OUTPUT_FILE)
+
+    if cache is not None:
+        print(cache.report())
+    return matrix
 
+# Unary operations
+def unary_ops_test(objects=def_objects, operations=def_un_ops, OUTPUT_FILE='Unary_operations.xlsx', timeout=None,
+                   mem_limit=None, cache=None, output='excel'):
+    expressions = {operation: f'{operations[operation]}copy_self_' for operation in operations}
+    return unary_test(expressions, objects, 'Operation', 'Unary_operations', OUTPUT_FILE, timeout, mem_limit, cache,
+                      output)
+
+# Binary operations
+def binary_ops_test(selves=def_objects, others=def_objects, operations=def_bin_ops,
+                    OUTPUT_FILE='Binary_operations.xlsx', workers=None, timeout=None, mem_limit=None, cache=None,
+                    stream=False, output='excel'):
+    # To ensure proper execution keys of in-place operators should start with "IP_"
+
+    expressions = {}
+    for operation in operations:
+        exec_str = 'pass'
+        if operation.startswith('IP_'):
+            exec_str = f'copy_self_ {operations[operation]} copy_other'
+            eval_str = 'copy_self_'
+        else:
+            eval_str = f'copy_self_ {operations[operation]} copy_other'
+        expressions[operation] = (exec_str, eval_str)
+
+    return binary_test(expressions, selves, others, OUTPUT_FILE, workers, timeout, mem_limit, cache, stream, output)
+
+# unary methods (methods only requiring self as an argument)
+def unary_meth_test(objects=def_objects, methods=def_methods, OUTPUT_FILE='Unary_methods.xlsx', timeout=None,
+                    mem_limit=None, cache=None, output='excel'):
+    expressions = {method: f'copy_self_.{methods[method]}()' for method in methods}
+    return unary_test(expressions, objects, 'Method', 'Unary_methods', OUTPUT_FILE, timeout, mem_limit, cache, output)
+
+# binary methods (requiring another argument in addition to self)
+def binary_meth_test(selves=def_objects, others=def_objects, methods=def_methods, OUTPUT_FILE='Binary_methods.xlsx',
+                     workers=None, timeout=None, mem_limit=None, cache=None, stream=False, output='excel'):
+    expressions = {method: (None, f'copy_self_.{methods[method]}(copy_other)') for method in methods}
+    return binary_test(expressions, selves, others, OUTPUT_FILE, workers, timeout, mem_limit, cache, stream, output)
+
+# unary functions (functions only requiring one argument)
+def unary_func_test(objects=def_objects, functions=def_funcs, OUTPUT_FILE='Unary_functions.xlsx', timeout=None,
+                    mem_limit=None, cache=None, output='excel'):
+    expressions = {function: f'{functions[function]}(copy_self_)' for function in functions}
+    return unary_test(expressions, objects, 'Function', 'Unary_functions', OUTPUT_FILE, timeout, mem_limit, cache,
+                      output)
+
+# binary functions (requiring two arguments)
+def binary_func_test(selves=def_objects, others=def_objects, functions=def_funcs, OUTPUT_FILE='Binary_functions.xlsx',
+                     workers=None, timeout=None, mem_limit=None, cache=None, stream=False, output='excel'):
+    expressions = {function: (None, f'{functions[function]}(copy_self_, copy_other)') for function in functions}
+    return binary_test(expressions, selves, others, OUTPUT_FILE, workers, timeout, mem_limit, cache, stream, output)
+
+testers = {'unary_ops_test': unary_ops_test, 'binary_ops_test': binary_ops_test, 'unary_meth_test': unary_meth_test,
+           'binary_meth_test': binary_meth_test, 'unary_func_test': unary_func_test,
+           'binary_func_test': binary_func_test}
+
+# Run a tester with a 'Profiler' and return its report. With 'cprofile_file' the run is also profiled with cProfile and
+# the stats are dumped there (readable by pstats, snakeviz or flameprof for a flame graph).
+def profile_run(tester, *args, cprofile_file=None, **kwargs):
+    global profiler
+    profiler = Profiler()
+    try:
+        if cprofile_file is None:
+            tester(*args, **kwargs)
+        else:
+            import cProfile
+            with cProfile.Profile() as cprofile:
+                tester(*args, **kwargs)
+            cprofile.dump_stats(cprofile_file)
+        return profiler.report()
+    finally:
+        profiler = None
 
 if __name__ == '__main__':
-    binary_meth_test(selves=more_objs, others=more_objs, methods=def_bin_magics, OUTPUT_FILE='Binary_magic_meths_more_objs.xlsx')
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Test operations / methods / functions on all objects.')
+    parser.add_argument('--profile', nargs='?', const='binary_ops_test', choices=testers, metavar='TESTER',
+                        help='run a tester (default binary_ops_test) on the default objects and print the timings')
+    parser.add_argument('--cprofile', metavar='FILE', help='with --profile, also dump cProfile stats into FILE')
+    args = parser.parse_args()
+
+    if args.profile:
+        print(profile_run(testers[args.profile], cprofile_file=args.cprofile))
+    else:
+        binary_meth_test(selves=more_objs, others=more_objs, methods=def_bin_magics, OUTPUT_FILE='Binary_magic_meths_more_objs.xlsx')
\ No newline at end of file